@@ -5,43 +5,108 @@ Created on Wed Sep 25 11:32:53 2024
 @author: SN -> Acknowledgments to the appropriate parties
 """
 
-from threading import Thread
 import time
 import pyvista as pv
 from pyvistaqt import BackgroundPlotter
 import numpy as np
 import glob
+import os
+from mesh_cache import default_cache, to_polydata
+
+class PlaybackClock:
+     def __init__(self, ts):
+          """
+          Wall-clock frame counter of a timer-driven playback, a late timer skips the frames it missed.
+
+          Args:
+               ts (float): Time of every frame (s).
+          """
+          self.ts = ts
+          self.startTime = None
+          self.frame = -1
+          self.droppedFrames = 0
+
+     def next(self, nFrames):
+          """Frame of the current time, None if it is still the last shown frame."""
+          now = time.perf_counter()
+          if self.startTime is None:
+               self.startTime = now
+          frame = min(int((now - self.startTime) / self.ts), nFrames - 1)
+          if frame == self.frame:
+               return None
+          self.droppedFrames += max(frame - self.frame - 1, 0)
+          self.frame = frame
+          return frame
+
+def setupView(plotter, bounds):
+     cpos = [(-8, -8, 8), # zoom x y z
+             (0.5, 0.5, 0.5), # Movimiento x y z
+             (0.28, 0.28, 0.28)]
+     plotter.show_bounds(grid ='back', location = 'outer', color = '#000000', bounds = bounds,
+                         xlabel = 'x [m]', ylabel = 'y [m]', zlabel = 'z [m]')
+     plotter.camera_position = cpos
+     plotter.view_isometric()
 
 class Omnirobot:
-     def __init__(self,path = "", color = None):
+     def __init__(self,path = "", color = None, cache = None, level = 0):
+          """
+          Args:
+               path (str): Folder with the STL parts of the robot.
+               color (list): Color of every part, None for black.
+               cache (MeshCache): Cache of the parsed meshes, None uses the one of the path/.mesh_cache folder.
+               level (int): Level of detail of the meshes, 0 is the full mesh, see MeshCache.load.
+          """
           self.color = color
           self.path = path
-          filenames = glob.glob(self.path+"/*.stl")
+          self.filenames = sorted(glob.glob(self.path+"/*.stl"))
+          self.cache = cache if cache is not None else default_cache(os.path.join(self.path, ".mesh_cache"))
+          self.level = level
+          # Points of every part at the origin (read-only, memory-mapped) and the moved working copies
           self.robot = []
           self.robotCopy = []
           self.isTrajectory = False
-          
-          for filename in filenames:
-             self.robot.append(pv.PolyData(filename))
-             self.robotCopy.append(pv.PolyData(filename))
     
-     def configureScene(self, bounds, window_size = [1024, 1024], title = "Robot omnidireccional"):
+     def configureScene(self, bounds, window_size = [1024, 1024], title = "Robot omnidireccional", plotter = None):
+          """A plotter can be shared by several robots, see RobotScene."""
           self.bounds = bounds
-          self.plotter = BackgroundPlotter(title=title)
-          self.plotter.set_background(color='white')
+          if plotter is None:
+               plotter = BackgroundPlotter(title=title)
+               plotter.set_background(color='white')
+          self.plotter = plotter
           
      def initRobot(self, x1, y1, phi, escala):          
           self.x1, self.y1, self.phi= x1, y1, phi
           self.escala = escala
           
+          # The STL files are parsed once, the scaled meshes come from the cache buffers
+          self.robot, self.robotCopy = [], []
+          for filename in self.filenames:
+               points, faces = self.cache.load(filename, self.escala, self.level)
+               self.robot.append(points)
+               self.robotCopy.append(to_polydata(points, faces))
+          # Views of the VTK point arrays, the poses are written straight into them
+          self.buffers = [copy.points for copy in self.robotCopy]
+          self.rotation = np.eye(3, dtype=np.float32)
+          self.precomputePoses()
+
           for i in range(len(self.robot)):
-               self.robot[i].points *= self.escala
-               self.robotCopy[i].points *= self.escala
                if self.color == None:
                     self.plotter.add_mesh(self.robotCopy[i], 'black')
                else:
                     self.plotter.add_mesh(self.robotCopy[i], self.color[i])
 
+     def precomputePoses(self):
+          # Transposed rotation and translation of every sample of the trajectory, computed in one batch
+          x = np.asarray(self.x1, dtype=np.float32)
+          y = np.asarray(self.y1, dtype=np.float32)
+          phi = np.broadcast_to(np.asarray(self.phi, dtype=np.float32), x.shape)
+          c, s = np.cos(phi), np.sin(phi)
+          self.rotations = np.zeros((len(x), 3, 3), dtype=np.float32)
+          self.rotations[:, 0, 0], self.rotations[:, 0, 1] = c, s
+          self.rotations[:, 1, 0], self.rotations[:, 1, 1] = -s, c
+          self.rotations[:, 2, 2] = 1
+          self.translations = np.column_stack((x, y))
+
      def initTrajectory(self, hx, hy):
           self.isTrajectory = True
           self.hx, self.hy = hx, hy
@@ -56,45 +121,92 @@ class Omnirobot:
           self.spline1 = pv.Spline(points,sizehd)
           self.plotter.add_mesh(self.spline1,color='blue',line_width = 4)
 
-     def startSimulation(self, step = 1, ts = 1):
-          cpos = [(-8, -8, 8), # zoom x y z
-                  (0.5, 0.5, 0.5), # Movimiento x y z
-                  (0.28, 0.28, 0.28)]
-          self.plotter.show_bounds(grid ='back', location = 'outer', color = '#000000', bounds = self.bounds,
-                                   xlabel = 'x [m]', ylabel = 'y [m]', zlabel = 'z [m]')
-          self.plotter.camera_position = cpos
-          self.plotter.view_isometric()
+     def startSimulation(self, step = 1, ts = 1, fps = 30):
+          """
+          Play the trajectory on the render timer of the plotter.
+
+          Args:
+               step (int): Samples of the trajectory advanced per frame.
+               ts (float): Time of every frame (s).
+               fps (float): Rate of the render timer, frames that are late are dropped, not queued.
+          """
+          setupView(self.plotter, self.bounds)
           self.step = step
           self.ts = ts
-          self.thread = Thread(target = self.simulation)
-          self.thread.start()
+          self.clock = PlaybackClock(ts)
+          self.plotter.add_callback(self.simulation, interval = max(int(1000 / fps), 1))
+
+     def nFrames(self, step):
+          return -(-len(self.x1) // step)
 
      def simulation(self):
-          for k in range(0,len(self.x1),self.step):
-               if self.isTrajectory:
-                    self.plotTrajectory(self.hx[k],self.hy[k],k)
-               self.robotUniciclo(self.x1[k],self.y1[k],self.phi,k)
-               time.sleep(self.ts)
+          # Timer callback, it runs in the GUI thread of the plotter
+          frame = self.clock.next(self.nFrames(self.step))
+          if frame is not None:
+               self.showFrame(frame, self.step)
+               self.plotter.render()
+
+     def showFrame(self, frame, step = 1):
+          k = min(frame * step, len(self.x1) - 1)
+          if self.isTrajectory:
+               self.plotTrajectory(self.hx[k],self.hy[k],k)
+          self._transform(self.rotations[k], self.translations[k])
 
      def robotUniciclo(self, x1, y1, phi, k):
-        # Rotation matrix for the given angle phi
-        Rz = np.array([[np.cos(phi), -np.sin(phi), 0],
-                       [np.sin(phi),  np.cos(phi), 0],
-                       [0, 0, 1]])
-    
-        for i in range(len(self.robotCopy)):
-            # Reset to original points from self.robot
-            self.robotCopy[i].points = self.robot[i].points.copy()            
-            # Apply rotation
-            self.robotCopy[i].points = (Rz @ self.robotCopy[i].points.T).T
-            # Apply translation
-            self.robotCopy[i].translate([x1, y1, 0], inplace=True)
+        # Rotation matrix for the given angle phi, transposed because the points are rows
+        c, s = np.cos(phi), np.sin(phi)
+        self.rotation[0, 0], self.rotation[0, 1] = c, s
+        self.rotation[1, 0], self.rotation[1, 1] = -s, c
+        self._transform(self.rotation, (x1, y1))
+
+     def _transform(self, rotation, translation):
+        # Rotation and translation written in place, no array of the size of the mesh is allocated
+        for base, buffer, copy in zip(self.robot, self.buffers, self.robotCopy):
+            np.matmul(base, rotation, out=buffer)
+            buffer[:, :2] += translation
+            copy.GetPoints().Modified()
                
      def plotTrajectory(self,hx,hy,k):
           self.spline.points[k:self.sizeh,0] = hx
           self.spline.points[k:self.sizeh,1] = hy
-         
-          
-          
-    
 
+class RobotScene:
+     def __init__(self, bounds, title = "Robots omnidireccionales"):
+          """
+          Several robots replayed in the same plotter by a single render timer.
+
+          Args:
+               bounds (list): [xmin, xmax, ymin, ymax, zmin, zmax] of the scene.
+               title (str): Title of the window.
+          Example:
+               scene = RobotScene([0, 5, 0, 5, 0, 0])
+               for route, color in zip(routes, colors):
+                    scene.addRobot(Omnirobot("stl", color), route[:, 0], route[:, 1], 0, 4)
+               scene.startSimulation(10, 0.05)
+          """
+          self.bounds = bounds
+          self.plotter = BackgroundPlotter(title=title)
+          self.plotter.set_background(color='white')
+          self.robots = []
+
+     def addRobot(self, robot, x1, y1, phi, escala, trajectory = True):
+          robot.configureScene(self.bounds, plotter = self.plotter)
+          if trajectory:
+               robot.initTrajectory(x1, y1)
+          robot.initRobot(x1, y1, phi, escala)
+          self.robots.append(robot)
+          return robot
+
+     def startSimulation(self, step = 1, ts = 1, fps = 30):
+          """Same as Omnirobot.startSimulation, every robot stops at the end of its own trajectory."""
+          setupView(self.plotter, self.bounds)
+          self.step = step
+          self.clock = PlaybackClock(ts)
+          self.plotter.add_callback(self.simulation, interval = max(int(1000 / fps), 1))
+
+     def simulation(self):
+          frame = self.clock.next(max(robot.nFrames(self.step) for robot in self.robots))
+          if frame is not None:
+               for robot in self.robots:
+                    robot.showFrame(frame, self.step)
+               self.plotter.render()
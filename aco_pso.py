@@ -5,21 +5,41 @@ Created on Sat Jan 18 12:46:18 2025
 @author: Rodolfo Alberto Reyes Corona
 """
 
+from collections import namedtuple
+import heapq
+import time
 import numpy as np
-from pso import ParticleSwarmOptimizer
+from pso import SwarmOptimizer
+from grid_graph import GridGraph
+from colony import construct_colony
+from tuning import RolloutFitness
+from shortest_path import astar, dijkstra, follow, repair_dijkstra
+from path_tools import path_length, remove_loops, repair_path, smooth_path
+
+# Compact state of the planner after one iteration
+IterationSnapshot = namedtuple('IterationSnapshot', ['iteration', 'best_length', 'best_path', 'iteration_time', 'elapsed'])
 
 class Ant:
-    def __init__(self, initial_point):
+    def __init__(self, graph, initial_point, nodes, cost, edges=None):
+        """
+        Path of an ant stored as node ids, the coordinates are produced only when requested.
+
+        Args:
+            graph (GridGraph): Grid graph the node ids belong to.
+            initial_point (list): Bidimensional initial point, first point of the path.
+            nodes (np.ndarray): Node ids of the path, the first one is the initial point.
+            cost (float): Length of the path.
+            edges (np.ndarray): Edge ids crossed by the ant, optional.
+        """
+        self.graph = graph
         self.initial_point = initial_point
-        self.reset()
-        
-    def move_to(self, new_node, distance):
-        self.path.append(new_node)
-        self.cost += distance
+        self.nodes = nodes
+        self.cost = cost
+        self.edges = edges if edges is not None else np.empty(0, dtype=np.int32)
 
-    def reset(self):
-        self.path = [self.initial_point]
-        self.cost = 0
+    @property
+    def path(self):
+        return [self.initial_point] + [list(point) for point in self.graph.coordinates[self.nodes[1:]]]
 
     def get_path(self):
         return self.path
@@ -27,8 +47,15 @@ class Ant:
     def get_cost(self):
         return self.cost
 
+    def get_edges(self):
+        return self.edges
+
 class ACO_PSO:
-    def __init__(self, initial_point, final_point, n_ants, n_iterations, size):
+    # Engine used to tune alpha and beta, ParticleSwarmOptimizer has the same interface
+    swarm_engine = SwarmOptimizer
+
+    def __init__(self, initial_point, final_point, n_ants, n_iterations, size, seed=None, tuning='static', n_workers=None, top_k=3, cache=None, profiler=None, graph=None,
+                 seed_shortest_path=False, heuristic_weight=0.0, gap_tolerance=None, tabu=False, smooth_paths=False):
         """
         Args:
             initial_point (list): Bidimensional initial point
@@ -37,9 +64,31 @@ class ACO_PSO:
             n_iterations (int): Maximum number of iterations
             learning_rate (float): Rate it which pheromone decays. The pheromone value is multiplied by decay, 
                     so 0.95 will lead to decay, 0.5 to much faster decay.
-            size (int): This number provide the size of the resolution space in a quad area.
+            size (int): This number provide the size of the resolution space in a quad area. Ignored when graph is given.
             alpha (int or float): Exponenet on pheromone, higher alpha gives pheromone more weight. Firs iteration = random
             beta (int or float): Exponent on distance, higher beta give distance more weight. First iteration = random
+            seed (int): Seed of the random generator used by the colony, None for a random seed.
+            tuning (str): 'static' keeps the PSO without fitness, 'rollout' scores every (alpha, beta)
+                    particle with a short seeded ACO rollout on the current pheromones.
+            n_workers (int): Worker processes of the rollout tuning, None for every core, 0 or 1 to run inline.
+                    Scripts using worker processes must guard their entry point with if __name__ == '__main__'.
+            top_k (int): Number of best distinct paths kept across all the iterations, see top_ants.
+            cache (PlanCache): Cache of solved plans, an exact hit returns the stored path and a near hit
+                    warm-starts the pheromones and alpha/beta. None disables it.
+            profiler (PhaseProfiler): Per-phase timers and counters of every iteration, None disables them.
+            graph (GridGraph): Search space, e.g. GridGraph.from_file for an occupancy map with obstacles.
+                    None builds the empty 0.5 m grid of size.
+            seed_shortest_path (bool): Seed the pheromones of the exact shortest path before the first iteration.
+            heuristic_weight (float): Exponent of a goal-directed term, edge length / (edge length + detour),
+                    where the detour is the increase of the exact cost-to-go along the edge. The term is 1 on
+                    shortest paths and 1/3 going straight back. 0 keeps the inverse distance visibility only.
+            gap_tolerance (float): Stop as soon as best_length <= (1 + gap_tolerance) * lower_bound,
+                    the exact shortest path length. None disables the rule. With any of the last three
+                    options, iterate_ACO_PSO raises a ValueError if the final point is unreachable.
+            tabu (bool): Every ant keeps the set of its visited nodes and does not go back to them,
+                    unless it is trapped. Avoids the cycles of the random walk during construction.
+            smooth_paths (bool): After the last iteration remove the loops of the best paths and shortcut
+                    the best path with straight segments over free cells, see best_waypoints.
         Example:
             hybrid_algorithm = ACO_PSO([0,0], [5,5], 100, 10, 10)
         """ 
@@ -48,18 +97,38 @@ class ACO_PSO:
         self.n_ants = n_ants
         self.n_iterations = n_iterations
         self.learning_rate = 0.95
-        self.size = size
-        self.table = {}
-        self.best_path = None
+        self.graph = graph if graph is not None else GridGraph(size, 0.5, 0.8)
+        self.size = self.graph.size
+        self.best_nodes = None
         self.best_length = np.inf
-        self.alpha = np.random.uniform(0,1)
-        self.beta  = np.random.uniform(0,1)
+        self.top_k = top_k
+        self.top_heap = []
+        self.cache = cache
+        self.profiler = profiler
+        self.seed_shortest_path = seed_shortest_path
+        self.heuristic_weight = heuristic_weight
+        self.gap_tolerance = gap_tolerance
+        self.lower_bound = None
+        self.heuristic = None
+        self.shortest_nodes = None
+        self.cost_to_go = None
+        self.tabu = tabu
+        self.smooth_paths = smooth_paths
+        self.best_waypoints = None
+        self.best_waypoints_length = np.inf
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.alpha = self.rng.uniform(0,1)
+        self.beta  = self.rng.uniform(0,1)
+        # Max step allowed for a better time response, this parameter you can modify.
+        self.max_step = 250
+        self.tuning = tuning
+        self.n_workers = n_workers
+        self.tuner = None
 
-        x_i, x_f = 0, self.size[0] + 0.01
-        y_i, y_f = 0, self.size[1] + 0.01
-        x = list(np.arange(x_i, x_f, 0.5))
-        y = list(np.arange(y_i, y_f, 0.5))  
-        self.X, self.Y = np.meshgrid(x, y)
+        # Pheromones indexed by edge id, routes enter the table once an ant crosses them
+        self.pheromones = np.full(self.graph.n_edges, 0.01)
+        self.visited_routes = np.zeros(self.graph.n_edges, dtype=bool)
 
     def euclidean_distance(self, point_1, point_2):
         x_1, y_1 = point_1
@@ -69,116 +138,432 @@ class ACO_PSO:
 
     # Esta función proporciona los nodos posibles en una relación de distancia mínima
     def possible_options_nodes(self, node):
-        min_distance = 0.8  # Ajusté la distancia mínima a 0.707 (aproximadamente sqrt(2) * 0.5)
-        options = []
-        for i in range(self.X.shape[0]):  # Cambié self.size[0] a self.X.shape[0] para asegurarme de iterar sobre la malla
-            for j in range(self.Y.shape[1]):  # Igual para el eje Y
-                possible_new_node = [self.X[i, j], self.Y[i, j]]
-                distance = self.euclidean_distance(node, possible_new_node)
-                if 0 < distance <= min_distance:  # Comprobamos que la distancia sea mayor que 0 y menor o igual a min_distance
-                    options.append(possible_new_node)
-        return options    
+        node_id = self.graph.node_index(node)
+        if node_id >= 0:
+            # Lookup O(grado) sobre la adyacencia precalculada
+            neighbors = self.graph.neighbors(node_id)
+        else:
+            # El nodo no pertenece a la malla, se comparan las distancias a todos los nodos
+            distance = np.sqrt(((self.graph.coordinates - node) ** 2).sum(axis=1))
+            neighbors = np.flatnonzero((distance > 0) & (distance <= self.graph.radius))
+        return [list(option) for option in self.graph.coordinates[neighbors]]
 
     # Choose new node function provide a new node based in the probability equation.
     def choose_new_node(self, node, nodes_options, pheromones, alpha, beta):
-        probabilities = []
-        for i, node_option in enumerate(nodes_options):
-            distance = self.euclidean_distance(node, node_option)
-            visibility = 1 / distance
-            pheromone = pheromones[i]
-            probabilities.append((pheromone ** beta) * (visibility ** alpha))
-
-        probabilities = np.array(probabilities)
-        probabilities /= probabilities.sum()
-        cumulative_prob = np.cumsum(probabilities)
-        rng = np.random.uniform(0, 1)
-        return nodes_options[np.searchsorted(cumulative_prob, rng)]
+        # Same roulette as construct_colony, drawn from the generator of the planner
+        distance = np.sqrt(((np.asarray(nodes_options, dtype=float) - np.asarray(node, dtype=float)) ** 2).sum(axis=1))
+        weights = (np.asarray(pheromones, dtype=float) ** beta) * ((1 / distance) ** alpha)
+        cumulative_prob = np.cumsum(weights)
+        threshold = self.rng.random() * cumulative_prob[-1]
+        return nodes_options[min(int(np.searchsorted(cumulative_prob, threshold)), len(nodes_options) - 1)]
+
+    def get_route(self, node, new_node):
+        # Edge id of the route node -> new_node, -1 if the route is not part of the grid
+        source = self.graph.node_index(node)
+        target = self.graph.node_index(new_node)
+        if source < 0 or target < 0:
+            return -1
+        return self.graph.edge_index(source, target)
 
     def get_pheromones(self, options, node):
-        pheromones = []
-        for option in options:
-            possible_route = (tuple(node), tuple(option))
-            pheromones.append(self.table.get(possible_route, 0.01))
-        return pheromones
+        routes = np.array([self.get_route(node, option) for option in options], dtype=np.int64)
+        return np.where(routes >= 0, self.pheromones[routes], 0.01)
 
     def actualization(self, pheromones, ants):
+        routes = np.full((len(ants), max([len(ant.get_edges()) for ant in ants], default=0)), -1, dtype=np.int64)
+        for row, ant in zip(routes, ants):
+            row[:len(ant.get_edges())] = ant.get_edges()
+        costs = np.array([ant.get_cost() for ant in ants], dtype=float)
+        self.deposit(pheromones, routes, costs)
+
+    def deposit(self, pheromones, routes, costs):
+        """
+        Evaporate and deposit the pheromones of the routes crossed by a colony.
+
+        Args:
+            pheromones (np.ndarray): Pheromone value of every edge, updated in place.
+            routes (np.ndarray): (n_ants, steps) edge ids crossed by every ant, -1 entries are ignored.
+            costs (np.ndarray): Path length of every ant.
+        """
         rho = 0.1
-        for route, pheromone in self.table.items():
-            new_pheromone = (1 - rho) * pheromone
-            for ant in ants:
-                ant_path = ant.get_path()
-                for j in range(len(ant_path) - 1):
-                    route_aux = (tuple(ant_path[j]), tuple(ant_path[j + 1]))
-                    if route == route_aux:
-                        new_pheromone += self.learning_rate / ant.get_cost()
-            self.table[route] = new_pheromone
+        # Evaporation of the routes already present in the table
+        pheromones[self.visited_routes] *= (1 - rho)
+        # Deposit of every ant over the routes it crossed, repeated routes deposit again
+        deposits = np.repeat(self.learning_rate / np.asarray(costs, dtype=float), routes.shape[1])
+        routes = routes.ravel()
+        crossed = routes >= 0
+        np.add.at(pheromones, routes[crossed], deposits[crossed])
+        self.visited_routes[routes[crossed]] = True
 
     def initialize_ants(self):
-        self.ants = [Ant(self.initial_point) for _ in range(self.n_ants)]
+        # Node ids of every path live in preallocated buffers reused by every iteration
+        self.colony = (np.empty((self.n_ants, self.max_step + 1), dtype=np.int32),
+                       np.empty((self.n_ants, self.max_step), dtype=np.int32),
+                       np.empty(self.n_ants, dtype=np.int64),
+                       np.empty(self.n_ants))
+        self.colony[2].fill(0)
+        self.colony[3].fill(np.inf)
+        self.initial_cost = np.inf
 
-    def run_ACO_PSO(self):
-        # Max step allowed for a better time response, this parameter you can modify.
-        max_step = 250
-        self.initialize_ants()
+    @property
+    def ants(self):
+        """Ants of the last iteration."""
+        paths, edges, n_steps, costs = self.colony
+        return [Ant(self.graph, self.initial_point, path[:steps + 1].copy(), cost, route[:steps].copy())
+                for path, route, steps, cost in zip(paths, edges, n_steps, costs)]
 
-        # Particle Swarm Optimization (PSO) initialization parameters.       
-        num_particles = 300
-        num_iterations = 100
+    @property
+    def best_path(self):
+        if self.best_nodes is None:
+            return None
+        return Ant(self.graph, self.initial_point, self.best_nodes, self.best_length).path
+
+    def top_ants(self, k=None):
+        """Best distinct paths found across all the iterations, sorted by length."""
+        best = sorted(self.top_heap, key=lambda entry: -entry[0])[:k]
+        return [Ant(self.graph, self.initial_point, nodes, -cost) for cost, key, nodes in best]
+
+    def update_top_ants(self, paths, n_steps, costs):
+        # Only the k cheapest ants of the iteration can enter the bounded heap
+        k = min(self.top_k, len(costs))
+        if k == 0:
+            return
+        candidates = np.argpartition(costs, k - 1)[:k]
+        keys = set(key for cost, key, nodes in self.top_heap)
+        for ant in candidates[np.isfinite(costs[candidates])]:
+            nodes = paths[ant, :n_steps[ant] + 1].copy()
+            key = nodes.tobytes()
+            if key in keys:
+                continue
+            entry = (-costs[ant], key, nodes)
+            if len(self.top_heap) < self.top_k:
+                heapq.heappush(self.top_heap, entry)
+            elif entry[0] > self.top_heap[0][0]:
+                keys.discard(heapq.heapreplace(self.top_heap, entry)[1])
+            keys.add(key)
+
+    def construct_paths(self):
+        """Advance the whole colony in lockstep, the result is stored in the colony buffers."""
+        start = self.graph.node_index(self.initial_point)
+        if start < 0:
+            raise ValueError(f'The initial point {self.initial_point} is not a node of the grid')
+        goal = self.graph.node_index(self.final_point)
+        paths, edges, n_steps, costs = construct_colony(self.graph, self.pheromones, self.alpha, self.beta, start, goal,
+                                                        self.n_ants, self.max_step, self.rng, out=self.colony,
+                                                        profiler=self.profiler, heuristic=self.heuristic,
+                                                        tabu=self.tabu)
+
+        # We verify the best cost based on path and lenght
+        best = int(np.argmin(costs))
+        if costs[best] < self.best_length:
+            self.best_length = costs[best]
+            self.best_nodes = paths[best, :n_steps[best] + 1].copy()
+        self.update_top_ants(paths, n_steps, costs)
+
+        if self.profiler is not None:
+            reached = paths[np.arange(self.n_ants), n_steps] == goal
+            self.profiler.count('ants', self.n_ants)
+            self.profiler.count('ant_steps', int(n_steps.sum()))
+            self.profiler.count('ants_reached_goal', int(reached.sum()))
+            self.profiler.count('ants_max_step', int(((n_steps == self.max_step) & ~reached).sum()))
+            self.profiler.gauge('mean_steps_per_ant', float(n_steps.mean()))
+            self.profiler.gauge('max_steps_per_ant', int(n_steps.max()))
+        return edges[:, :n_steps.max()], costs
+
+    def run_iteration(self, it):
         var_min = 0
         var_max = 1
         variables = 2
-        
-        for it in range(self.n_iterations):
-            for h, ant in enumerate(self.ants):
-                print(f'\rExecuting the iteration {(it + 1):04} of {str(self.n_iterations).zfill(4)}. Ant: {str(h + 1).zfill(4)} / {str(self.n_ants).zfill(4)}', end='')            
-                ant.reset()
-                actual_node = self.initial_point
-                step = 0
-                previous_node = []
-                
-                while True:
-                    # Search possible options nodes
-                    options = self.possible_options_nodes(actual_node)
-                    if(step > 1):
-                        for option in options:
-                            if(option == previous_node):
-                                options.remove(option)
-                    
-                    # Get the value of the pheromones
-                    pheromones = self.get_pheromones(options, actual_node)
-                    # Choose a new node using the possible optines and values
-                    new_node = self.choose_new_node(actual_node, options, pheromones, self.alpha, self.beta)
-                    previous_node = actual_node
-                    distance = self.euclidean_distance(actual_node, new_node)
-                    ant.move_to(new_node, distance)
-                    actual_node = new_node
-                    step += 1
-
-                    if actual_node == self.final_point or step == max_step:
-                        break
-    
-                # We verify the best cost based on path and lenght
-                if ant.get_cost() < self.best_length:
-                    self.best_length = ant.get_cost()
-                    self.best_path = ant.get_path()
-    
-            # Actualization of the values.
-            self.actualization(self.table, self.ants)
-            
-            # In this part, we need to verify if is the first iteration, this neccessary for PSO algorithm
-            if it == 0:
-                initial_cost = self.best_length
-                current_cost = np.inf
+
+        profiler = self.profiler
+        if profiler is not None:
+            iteration_start = time.perf_counter()
+        edges, costs = self.construct_paths()
+        # Actualization of the values.
+        if profiler is not None:
+            actualization_start = time.perf_counter()
+            profiler.add_time('construction', actualization_start - iteration_start)
+        self.deposit(self.pheromones, edges, costs)
+        if profiler is not None:
+            pso_start = time.perf_counter()
+            profiler.add_time('actualization', pso_start - actualization_start)
+            profiler.gauge('pheromone_table_size', int(self.visited_routes.sum()))
+
+        if self.tuning == 'rollout':
+            self.tune_rollout(var_min, var_max, variables)
+        else:
+            self.tune_static(it, var_min, var_max, variables)
+
+        if profiler is not None:
+            profiler.add_time('pso', time.perf_counter() - pso_start)
+            profiler.count('iterations')
+            profiler.gauge('best_length', float(self.best_length))
+            profiler.gauge('alpha', float(self.alpha))
+            profiler.gauge('beta', float(self.beta))
+            profiler.end_iteration(it)
+
+    def tune_static(self, it, var_min, var_max, variables):
+        # Particle Swarm Optimization (PSO) initialization parameters.       
+        num_particles = 300
+        num_iterations = 100
+
+        # In this part, we need to verify if is the first iteration, this neccessary for PSO algorithm
+        if it == 0:
+            self.initial_cost = self.best_length
+            current_cost = np.inf
+        else:
+            current_cost = self.best_length
+
+        # The PSO algorithm is provided with a mathematical function and reaches its global minimum, however, 
+        # here we do not have an associated function, so the results obtained in ACO are taken and in this way, 
+        # it is assumed that it converged to the global minimum.
+        optimizer = self.swarm_engine(num_particles, num_iterations, var_min, var_max, variables, self.initial_cost, current_cost, rng=self.rng)
+        optimizer.optimize()
+        # We obtained the new values of alpha and beta
+        self.beta, self.alpha = optimizer.get_best_position()
+
+    def tune_rollout(self, var_min, var_max, variables):
+        # Every particle is scored by a short rollout, so a smaller swarm is enough
+        num_particles = 30
+        num_iterations = 20
+        if self.tuner is None:
+            start = self.graph.node_index(self.initial_point)
+            goal = self.graph.node_index(self.final_point)
+            self.tuner = RolloutFitness(self.graph, start, goal, max_step=self.max_step,
+                                        n_workers=self.n_workers, seed=int(self.rng.integers(2 ** 31)),
+                                        heuristic=self.heuristic, tabu=self.tabu)
+        self.tuner.reset(self.pheromones)
+        optimizer = self.swarm_engine(num_particles, num_iterations, var_min, var_max, variables, np.inf, np.inf,
+                                      rng=self.rng, fitness=self.tuner)
+        optimizer.optimize()
+        self.beta, self.alpha = optimizer.get_best_position()
+        if self.profiler is not None:
+            self.profiler.gauge('rollout_evaluations', self.tuner.evaluations)
+
+    def precompute_shortest_path(self):
+        """Exact search over the grid graph: lower bound, pheromone seeding and goal-directed heuristic."""
+        start = self.graph.node_index(self.initial_point)
+        goal = self.graph.node_index(self.final_point)
+        if start < 0 or goal < 0:
+            self.lower_bound = np.inf
+            return
+        if self.heuristic_weight > 0:
+            # Cost-to-go of every node, the path follows the predecessors towards the goal.
+            # replan repairs it in place of a new search when only some cells changed.
+            if self.cost_to_go is None:
+                self.cost_to_go = dijkstra(self.graph, goal)
+            cost_to_go, predecessor = self.cost_to_go
+            self.shortest_nodes = follow(predecessor, start) if np.isfinite(cost_to_go[start]) else None
+            self.lower_bound = cost_to_go[start]
+            lengths = self.graph.edge_lengths
+            with np.errstate(invalid='ignore'):
+                detour = lengths + cost_to_go[self.graph.indices] - cost_to_go[self.graph.sources]
+            # Edges leading to nodes that can not reach the goal are never chosen
+            self.heuristic = np.zeros(self.graph.n_edges)
+            reachable = np.isfinite(detour)
+            self.heuristic[reachable] = (lengths[reachable] / (lengths[reachable] + detour[reachable])) ** self.heuristic_weight
+        else:
+            self.shortest_nodes, self.lower_bound = astar(self.graph, start, goal)
+
+        if self.seed_shortest_path and self.shortest_nodes is not None:
+            path_edges = [self.graph.edge_index(a, b) for a, b in zip(self.shortest_nodes[:-1], self.shortest_nodes[1:])]
+            self.pheromones[path_edges] = max(self.pheromones[path_edges].max(), self.learning_rate / self.lower_bound)
+            self.visited_routes[path_edges] = True
+
+    def post_process(self):
+        """Loop-free best paths, and the shortcut waypoints of the best path."""
+        if self.best_nodes is None:
+            return
+        self.best_nodes = remove_loops(self.best_nodes)
+        self.best_length = path_length(self.graph.coordinates[self.best_nodes])
+        top_heap = []
+        for cost, key, nodes in self.top_heap:
+            nodes = remove_loops(nodes)
+            # Two paths may become the same once their loops are removed
+            if all(nodes.tobytes() != entry[1] for entry in top_heap):
+                top_heap.append((-path_length(self.graph.coordinates[nodes]), nodes.tobytes(), nodes))
+        heapq.heapify(top_heap)
+        self.top_heap = top_heap
+        # A path of the top heap may end shorter than the best path once its loops are gone
+        cost, key, nodes = max(top_heap, key=lambda entry: entry[0], default=(-np.inf, None, None))
+        if -cost < self.best_length:
+            self.best_nodes, self.best_length = nodes, -cost
+        waypoints, self.best_waypoints_length = smooth_path(self.graph, self.best_nodes)
+        self.best_waypoints = self.graph.coordinates[waypoints].tolist()
+
+    def replan(self, initial_point=None, final_point=None, blocked=None, freed=None):
+        """
+        Update the problem of a solved planner instead of starting over, e.g. the goal or an obstacle moved.
+
+        The pheromones and visited routes of the edges that still exist are kept, the new edges start
+        from the initial pheromone. alpha/beta are kept and the best path is repaired, so it is valid
+        right away. Run iterate_ACO_PSO or run_ACO_PSO again to improve it.
+        Only the edges around the changed cells are built again, and the exact cost-to-go of an unchanged
+        goal is repaired around them instead of searched again.
+
+        Args:
+            initial_point (list): New initial point, None keeps it.
+            final_point (list): New final point, None keeps it.
+            blocked (list): Points (x, y) whose cells become blocked.
+            freed (list): Points (x, y) whose cells become free.
+        Returns:
+            best_path (list): Repaired best path, None if there is no path to the new goal.
+        Example:
+            hybrid_algorithm.run_ACO_PSO()
+            hybrid_algorithm.replan(final_point=[6,5], blocked=[[3,3], [3,3.5]])
+            hybrid_algorithm.run_ACO_PSO(patience=3)
+        """
+        # Everything is built in locals first, a rejected replan leaves the planner untouched
+        old_graph = graph = self.graph
+        pheromones, visited_routes = self.pheromones, self.visited_routes
+        node_map = np.arange(old_graph.n_nodes)
+        touched = np.empty(0, dtype=np.int64)
+        if blocked is not None or freed is not None:
+            graph, node_map, edge_map, touched = old_graph.updated(blocked, freed, return_maps=True)
+            kept = edge_map >= 0
+            pheromones = np.full(graph.n_edges, 0.01)
+            visited_routes = np.zeros(graph.n_edges, dtype=bool)
+            pheromones[edge_map[kept]] = self.pheromones[kept]
+            visited_routes[edge_map[kept]] = self.visited_routes[kept]
+        initial_point = initial_point if initial_point is not None else self.initial_point
+        final_point = final_point if final_point is not None else self.final_point
+
+        start = graph.node_index(initial_point)
+        goal = graph.node_index(final_point)
+        if start < 0 or goal < 0:
+            raise ValueError(f'The points {initial_point} and {final_point} must be free nodes of the grid')
+        best_nodes = None
+        if self.best_nodes is not None:
+            best_nodes = repair_path(graph, node_map[self.best_nodes], start, goal)
+        # The cost-to-go only depends on the goal, the search is repaired around the changed cells
+        cost_to_go = None
+        if self.cost_to_go is not None and np.allclose(final_point, self.final_point):
+            old_cost_to_go, old_predecessor = self.cost_to_go
+            kept = node_map >= 0
+            distance = np.full(graph.n_nodes, np.inf)
+            predecessor = np.full(graph.n_nodes, -1, dtype=np.int64)
+            distance[node_map[kept]] = old_cost_to_go[kept]
+            predecessor[node_map[kept]] = np.where(old_predecessor[kept] >= 0,
+                                                   node_map[np.maximum(old_predecessor[kept], 0)], -1)
+            cost_to_go = distance, predecessor
+            if len(touched):
+                cost_to_go = repair_dijkstra(graph, distance, predecessor, goal, touched)
+
+        # The exact search and the rollout workers belong to the old problem
+        self.close()
+        self.graph = graph
+        self.pheromones, self.visited_routes = pheromones, visited_routes
+        self.initial_point, self.final_point = initial_point, final_point
+        self.lower_bound = None
+        self.heuristic = None
+        self.shortest_nodes = None
+        self.cost_to_go = cost_to_go
+        self.best_waypoints = None
+        self.best_waypoints_length = np.inf
+        self.best_nodes = best_nodes
+        self.best_length = np.inf if best_nodes is None else path_length(graph.coordinates[best_nodes])
+        self.top_heap = [] if best_nodes is None else [(-self.best_length, best_nodes.tobytes(), best_nodes)]
+        return self.best_path
+
+    def warm_start(self, entry, exact):
+        # Seed the planner with a plan of the cache
+        self.pheromones[:] = entry['pheromones']
+        self.visited_routes[:] = entry['visited_routes']
+        self.alpha, self.beta = entry['alpha'], entry['beta']
+        if exact:
+            self.best_nodes = np.asarray(entry['best_nodes']).copy()
+            self.best_length = entry['best_length']
+            self.top_heap = [(-self.best_length, self.best_nodes.tobytes(), self.best_nodes)]
+            # Plans stored before the top paths were cached only restore the best path
+            if 'top_nodes' in entry:
+                split = np.cumsum(entry['top_counts'])[:-1]
+                self.top_heap = [(-float(cost), nodes.tobytes(), nodes) for cost, nodes in
+                                 zip(entry['top_costs'], np.split(np.asarray(entry['top_nodes']).copy(), split))]
+                heapq.heapify(self.top_heap)
+            self.restore_colony()
+
+    def restore_colony(self):
+        # An exact cache hit runs no iteration, the ants of the colony walk the cached top paths
+        paths, edges, n_steps, costs = self.colony
+        best = self.top_ants()
+        for ant in range(self.n_ants):
+            nodes = best[ant % len(best)].nodes
+            steps = min(len(nodes) - 1, self.max_step)
+            paths[ant, :steps + 1] = nodes[:steps + 1]
+            edges[ant, :steps] = [self.graph.edge_index(source, target)
+                                  for source, target in zip(nodes[:steps], nodes[1:steps + 1])]
+            n_steps[ant] = steps
+            costs[ant] = best[ant % len(best)].cost
+
+    def close(self):
+        """Release the worker processes of the rollout tuning."""
+        if self.tuner is not None:
+            self.tuner.close()
+            self.tuner = None
+
+    def iterate_ACO_PSO(self, time_budget=None, patience=None, verbose=False):
+        """
+        Anytime version of run_ACO_PSO, yields an IterationSnapshot after every iteration.
+
+        Args:
+            time_budget (float): Seconds after which no new iteration is started, None for no limit.
+            patience (int): Stop after this number of iterations without improving best_length, None for no limit.
+            verbose (bool): Print a progress line per iteration.
+        Example:
+            for snapshot in hybrid_algorithm.iterate_ACO_PSO(time_budget=0.5, patience=5):
+                send_to_robot(snapshot.best_path)
+        """
+        self.initialize_ants()
+        start = time.perf_counter()
+        stall = 0
+        # Only a run that was not cut short by time_budget, patience or the consumer is an exact answer
+        complete = False
+        if self.cache is not None:
+            entry, exact = self.cache.lookup(self)
+            if entry is not None:
+                self.warm_start(entry, exact)
+            if exact:
+                # The waypoints are not stored, they are cheap to rebuild from the cached best path
+                if self.smooth_paths:
+                    self.post_process()
+                yield IterationSnapshot(-1, self.best_length, self.best_path, 0.0, time.perf_counter() - start)
+                return
+        if (self.seed_shortest_path or self.heuristic_weight > 0 or self.gap_tolerance is not None) \
+                and self.lower_bound is None:
+            self.precompute_shortest_path()
+            if not np.isfinite(self.lower_bound):
+                raise ValueError(f'The final point {self.final_point} can not be reached from {self.initial_point}')
+        try:
+            for it in range(self.n_iterations):
+                if verbose:
+                    print(f'\rExecuting the iteration {(it + 1):04} of {str(self.n_iterations).zfill(4)}. Ants: {str(self.n_ants).zfill(4)}', end='')
+                previous_length = self.best_length
+                iteration_start = time.perf_counter()
+                self.run_iteration(it)
+                now = time.perf_counter()
+                yield IterationSnapshot(it, self.best_length, self.best_path, now - iteration_start, now - start)
+
+                stall = 0 if self.best_length < previous_length else stall + 1
+                if self.gap_tolerance is not None and np.isfinite(self.lower_bound) \
+                        and self.best_length <= (1 + self.gap_tolerance) * self.lower_bound:
+                    complete = True
+                    break
+                if patience is not None and stall >= patience:
+                    break
+                if time_budget is not None and now - start >= time_budget:
+                    break
             else:
-                current_cost = self.best_length
-
-            # The PSO algorithm is provided with a mathematical function and reaches its global minimum, however, 
-            # here we do not have an associated function, so the results obtained in ACO are taken and in this way, 
-            # it is assumed that it converged to the global minimum.
-            optimizer = ParticleSwarmOptimizer(num_particles, num_iterations, var_min, var_max, variables, initial_cost, current_cost)
-            optimizer.optimize()
-            # We obtained the new values of alpha and beta
-            self.beta, self.alpha = optimizer.get_best_position()            
+                complete = True
+        finally:
+            self.close()
+            if self.smooth_paths:
+                self.post_process()
+            if self.cache is not None:
+                self.cache.store(self, complete)
+
+    def run_ACO_PSO(self, time_budget=None, patience=None, verbose=True):
+        for snapshot in self.iterate_ACO_PSO(time_budget, patience, verbose):
+            pass
         return self.ants
     
     def draw_ACOPSO2D(self, best_path, best_length):
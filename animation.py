@@ -5,19 +5,25 @@ Created on Sat Jan 18 12:46:18 2025
 @author: Rodolfo Alberto Reyes Corona
 """
 
+import os
+import shutil
+import subprocess
 import numpy as np
-import matplotlib.pyplot as plt
+from matplotlib import rcParams
 from matplotlib.animation import FuncAnimation
 
 class AnimationACO:
-    def __init__(self, size, paths, lenghts, n_ants, n_iterations, offsets, colors=None, interval=50):
+    def __init__(self, size, paths, lenghts, n_ants, n_iterations, offsets, colors=None, interval=50, num_points=500,
+                 headless=False):
         """
         Initialize the animation of the trajectories.
-        
-        :param paths: List of trajectories, each being a list of points (x, y).
+
+        :param paths: List of trajectories, each being a list of points (x, y). Any number of them.
         :param offsets: List of offsets (in frames) for each trajectory.
         :param colors: List of colors for each trajectory.
         :param interval: Interval between frames in milliseconds.
+        :param num_points: Number of frames of every trajectory, the points are equally spaced along the path.
+        :param headless: Render offscreen on an Agg canvas, no display or GUI backend is needed. Use save.
         """
         self.size = size
         self.paths = paths
@@ -25,74 +31,183 @@ class AnimationACO:
         self.n_ants = n_ants
         self.n_iterations = n_iterations
         self.offsets = offsets
-        self.colors = colors if colors else ['red', 'blue', 'green']
+        default_colors = ['red', 'blue', 'green'] + [f'C{k}' for k in range(3, len(paths))]
+        self.colors = colors if colors else default_colors[:len(paths)]
         self.interval = interval
-        self.num_points = 500
+        self.num_points = num_points
+        self.headless = headless
         self.total_frames = self.num_points + max(self.offsets)
         self.interpolated_paths = self._interpolate_paths()
-        
-        self.fig, self.ax = plt.subplots()
+
+        if headless:
+            # A bare Figure never touches pyplot, so no window (or display) is created
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            self.fig = Figure()
+            FigureCanvasAgg(self.fig)
+            self.ax = self.fig.add_subplot()
+        else:
+            import matplotlib.pyplot as plt
+            self.fig, self.ax = plt.subplots()
         self.ax.set_xlim(-0.5, self.size[0] + 0.5)
         self.ax.set_ylim(-0.5, self.size[1] + 0.5)
         self.ax.grid('True')
 
         self.lines = [self.ax.plot([], [], color=color, lw=2)[0] for color in self.colors]
         self.points = [self.ax.plot([], [], 'o', color=color)[0] for color in self.colors]
-        self.ax.legend(['Robot 1 path lenght: ' + str(round(self.lenghts[0],2)), 'Robot 2 path length: ' + str(round(self.lenghts[1],2)), 'Robot 3 path length: ' + str(round(self.lenghts[2],2))], loc = 'upper right')
+        self.ax.legend([f'Robot {k + 1} path length: {round(lenght, 2)}' for k, lenght in enumerate(self.lenghts)],
+                       loc='upper right')
         self.ax.set_title('Comparation using ACO/PSO with ' + str(n_ants) + ' ants and ' + str(n_iterations) + ' iterations')
-        
-        self.anim = FuncAnimation(
-            self.fig, self._update, frames=self.total_frames, interval=self.interval, blit=True
-        )
+
+        self.anim = None
+        if not headless:
+            self.anim = FuncAnimation(
+                self.fig, self._update, frames=self.total_frames, interval=self.interval, blit=True
+            )
 
     def _interpolate_paths(self):
         """
-        Interpolate the trajectories to have the same number of points.
-        
-        :return: List of interpolated trajectories (x, y).
+        Interpolate the trajectories by arc length, all of them with the same number of points.
+
+        :return: (n_paths, num_points, 2) array of interpolated trajectories.
         """
-        interpolated = []
-        for path in self.paths:
-            distances = [np.sqrt((path[i][0] - path[i - 1][0])**2 + (path[i][1] - path[i - 1][1])**2)
-                         for i in range(1, len(path))]
-            total_length = sum(distances)
-            t = [0]
-            for d in distances:
-                t.append(t[-1] + d / total_length)
-            t = np.array(t)  # Normalized to [0, 1]
-            
-            x = [p[0] for p in path]
-            y = [p[1] for p in path]
-            t = np.linspace(0, 1, len(path))
-            t_interp = np.linspace(0, 1, self.num_points)
-            x_interp = np.interp(t_interp, t, x)
-            y_interp = np.interp(t_interp, t, y)
-            interpolated.append((x_interp, y_interp))
+        interpolated = np.empty((len(self.paths), self.num_points, 2))
+        if not len(self.paths):
+            return interpolated
+        points = [np.asarray(path, dtype=float)[:, :2] for path in self.paths]
+        counts = np.array([len(path) for path in points])
+        stacked = np.concatenate(points)
+        first = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+        # Cumulative arc length of every path normalized to [0, 1], paths of length 0 use the point index
+        distances = np.sqrt((np.diff(stacked, axis=0) ** 2).sum(axis=1))
+        distances = np.append(distances, 0.0)
+        distances[first[1:] - 1] = 0.0  # No segment between the last point of a path and the next path
+        arc = np.cumsum(np.concatenate(([0.0], distances[:-1])))
+        arc -= np.repeat(arc[first], counts)
+        total = np.repeat(arc[first + counts - 1], counts)
+        index = np.arange(len(stacked)) - np.repeat(first, counts)
+        steps = np.repeat(np.maximum(counts - 1, 1), counts)
+        t = np.where(total > 0, arc / np.where(total > 0, total, 1), index / steps)
+
+        # Path k lives in [2k, 2k + 1], so one searchsorted interpolates every path at once
+        t += 2 * np.repeat(np.arange(len(points)), counts)
+        query = (np.linspace(0, 1, self.num_points)[None, :] + 2 * np.arange(len(points))[:, None]).ravel()
+        upper = np.searchsorted(t, query, side='right')
+        upper = np.clip(upper, first.repeat(self.num_points) + 1, (first + counts - 1).repeat(self.num_points))
+        lower = np.maximum(upper - 1, first.repeat(self.num_points))
+        span = t[upper] - t[lower]
+        weight = np.clip(np.divide(query - t[lower], span, out=np.zeros_like(span), where=span > 0), 0, 1)
+        interpolated.reshape(-1, 2)[:] = stacked[lower] + weight[:, None] * (stacked[upper] - stacked[lower])
         return interpolated
 
     def _update(self, frame):
         """
         Update the positions of the lines and points in each frame.
-        
+
         :param frame: Current frame of the animation.
         :return: List of updated objects.
         """
-        if frame >= self.offsets[2] + self.num_points - 1:
+        if self.anim is not None and frame >= max(self.offsets) + self.num_points - 1:
             self.anim.event_source.stop()  # Stop the animation
 
-        for i, (line, point, (x, y), offset) in enumerate(
-            zip(self.lines, self.points, self.interpolated_paths, self.offsets)
-        ):
+        for line, point, path, offset in zip(self.lines, self.points, self.interpolated_paths, self.offsets):
+            x, y = path[:, 0], path[:, 1]
             if frame >= offset:
                 relative_frame = frame - offset
                 if relative_frame < len(x):
-                    line.set_data(np.array(x[:relative_frame + 1]), np.array(y[:relative_frame + 1]))
-                    point.set_data(np.array([x[relative_frame]]), np.array([y[relative_frame]]))
+                    line.set_data(x[:relative_frame + 1], y[:relative_frame + 1])
+                    point.set_data(x[relative_frame:relative_frame + 1], y[relative_frame:relative_frame + 1])
                 else:
-                    line.set_data(np.array(x), np.array(y))
+                    line.set_data(x, y)
                     point.set_data([], [])
+            else:
+                line.set_data([], [])
+                point.set_data([], [])
         return self.lines + self.points
 
+    def render_frames(self, step=1, dpi=100, frames=None):
+        """
+        Render the frames offscreen, only the trajectories are drawn again in every frame.
+
+        :param step: Render one of every step frames.
+        :param dpi: Resolution of the rendered frames.
+        :param frames: Frame numbers to render, None for every step frames.
+        :return: Generator of (height, width, 4) RGBA arrays, each one is only valid until the next frame.
+        """
+        self.fig.set_dpi(dpi)
+        canvas = self.fig.canvas
+        artists = self.lines + self.points
+        for artist in artists:
+            artist.set_animated(True)
+        # Axes, grid, legend and title are rendered once and restored as a background
+        canvas.draw()
+        background = canvas.copy_from_bbox(self.fig.bbox)
+        for frame in frames if frames is not None else range(0, self.total_frames, step):
+            canvas.restore_region(background)
+            for artist in self._update(frame):
+                self.ax.draw_artist(artist)
+            yield np.asarray(canvas.buffer_rgba())
+
+    def save(self, filename, fps=None, dpi=100, step=1):
+        """
+        Render the animation offscreen and write it to disk.
+
+        :param filename: .mp4 (needs ffmpeg), .gif, or a .png pattern with a frame number field,
+                e.g. 'frames/frame_%04d.png'.
+        :param fps: Frames per second of the video, None uses the interval of the animation.
+        :param dpi: Resolution of the rendered frames.
+        :param step: Render one of every step frames, a faster preview of long runs.
+        :return: Number of rendered frames.
+        """
+        from PIL import Image
+
+        fps = fps if fps is not None else 1000 / (self.interval * step)
+        extension = os.path.splitext(filename)[1].lower()
+        if extension not in ('.mp4', '.gif', '.png'):
+            raise ValueError(f'Unsupported animation format {extension}, use .mp4, .gif or .png')
+        if extension == '.mp4' and shutil.which(rcParams['animation.ffmpeg_path']) is None:
+            raise RuntimeError('ffmpeg is needed to write .mp4 files, use a .gif or .png output instead')
+        directory = os.path.dirname(filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        n_frames = 0
+        if extension == '.png':
+            for frame in self.render_frames(step, dpi):
+                Image.fromarray(frame).save(filename % n_frames)
+                n_frames += 1
+        elif extension == '.gif':
+            # One palette for the whole animation, taken from the last frame where every path is drawn
+            last = next(self.render_frames(dpi=dpi, frames=[self.total_frames - 1]))
+            palette = Image.fromarray(last).convert('RGB').quantize()
+            images = [Image.fromarray(frame).convert('RGB').quantize(palette=palette, dither=Image.Dither.NONE)
+                      for frame in self.render_frames(step, dpi)]
+            images[0].save(filename, save_all=True, append_images=images[1:], duration=int(1000 / fps), loop=0,
+                           optimize=False)
+            n_frames = len(images)
+        else:
+            # Raw RGBA frames piped to ffmpeg, like the FFMpegWriter of matplotlib but without a full redraw
+            process = None
+            try:
+                for frame in self.render_frames(step, dpi):
+                    if process is None:
+                        height, width = frame.shape[:2]
+                        command = [rcParams['animation.ffmpeg_path'], '-y', '-loglevel', 'error',
+                                   '-f', 'rawvideo', '-pix_fmt', 'rgba', '-s', f'{width}x{height}', '-r', str(fps),
+                                   '-i', '-', '-vcodec', 'libx264', '-pix_fmt', 'yuv420p',
+                                   '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', filename]
+                        process = subprocess.Popen(command, stdin=subprocess.PIPE)
+                    process.stdin.write(frame.tobytes())
+                    n_frames += 1
+            finally:
+                if process is not None:
+                    process.stdin.close()
+                    if process.wait() != 0:
+                        raise RuntimeError(f'ffmpeg could not write {filename}')
+        return n_frames
+
     def show(self):
         """Show the animation."""
-        plt.show()
\ No newline at end of file
+        import matplotlib.pyplot as plt
+        plt.show()
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 16:10:52 2026
+
+@author: Rodolfo Alberto Reyes Corona
+
+Seeded, headless benchmarks of the planner, the swarm and the visualization hot paths.
+
+Example:
+    python benchmark.py                      # report the changes against benchmark_baseline.json
+    python benchmark.py --check              # exit with 1 on a regression, e.g. in CI
+    python benchmark.py --update-baseline    # store the results as the new reference
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')  # No plot windows
+from aco_pso import ACO_PSO
+from pso import ParticleSwarmOptimizer, SwarmOptimizer
+from animation import AnimationACO
+
+# Reference results committed with the repository, the timings are compared relative to a calibration run
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+
+def timeit(function, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return {'min': min(times), 'median': statistics.median(times)}, result
+
+def calibrate(repeats=5):
+    """Seconds of a fixed NumPy and pure Python workload, the speed of the machine the timings are scaled by."""
+    matrix = np.random.default_rng(0).random((300, 300))
+
+    def work():
+        total = 0.0
+        for k in range(300000):
+            total += k % 7
+        np.cumsum(np.sort(matrix, axis=1), axis=0)
+        return total + float((matrix @ matrix).sum())
+    return timeit(work, repeats)[0]['min']
+
+def octile_distance(point_1, point_2):
+    # Length of the shortest path between two nodes of an empty 8-connected grid
+    dx, dy = abs(point_2[0] - point_1[0]), abs(point_2[1] - point_1[1])
+    return max(dx, dy) - min(dx, dy) + np.sqrt(2) * min(dx, dy)
+
+def bench_planner(size, n_ants, n_iterations, repeats, seed):
+    initial_point, final_point = [0, 0], [size[0], size[1]]
+
+    def run():
+        planner = ACO_PSO(initial_point, final_point, n_ants, n_iterations, size, seed=seed)
+        planner.run_ACO_PSO(verbose=False)
+        return planner
+
+    times, planner = timeit(run, repeats)
+    goal = planner.graph.node_index(final_point)
+    optimal = octile_distance(initial_point, final_point)
+    return {'time': times,
+            'best_length': float(planner.best_length),
+            'optimal_length': float(optimal),
+            'optimality_ratio': float(planner.best_length / optimal),
+            'reached_goal': bool(planner.best_nodes is not None and planner.best_nodes[-1] == goal),
+            'path_nodes': int(len(planner.best_nodes)) if planner.best_nodes is not None else 0}
+
+def bench_swarm(engine, repeats, seed):
+    def run():
+        optimizer = engine(300, 100, 0, 1, 2, 10.0, 9.0, rng=np.random.default_rng(seed))
+        optimizer.optimize()
+        return optimizer
+    times, optimizer = timeit(run, repeats)
+    return {'time': times}
+
+def bench_neighbors(size, repeats, seed):
+    planner = ACO_PSO([0, 0], [size[0], size[1]], 1, 1, size, seed=seed)
+    nodes = [list(point) for point in planner.graph.coordinates]
+
+    def run():
+        for node in nodes:
+            planner.possible_options_nodes(node)
+    times, _ = timeit(run, repeats)
+    return {'time': times, 'calls': len(nodes)}
+
+def bench_actualization(size, n_ants, repeats, seed):
+    planner = ACO_PSO([0, 0], [size[0], size[1]], n_ants, 1, size, seed=seed)
+    planner.run_ACO_PSO(verbose=False)
+    ants = planner.ants
+    times, _ = timeit(lambda: planner.actualization(planner.pheromones, ants), repeats)
+    return {'time': times, 'steps': int(sum(len(ant.get_edges()) for ant in ants))}
+
+def bench_interpolation(size, n_ants, repeats, seed):
+    planner = ACO_PSO([0, 0], [size[0], size[1]], n_ants, 5, size, seed=seed, top_k=3)
+    planner.run_ACO_PSO(verbose=False)
+    # Only the attributes used by _interpolate_paths, the figure is never created
+    animation = SimpleNamespace(paths=[ant.path for ant in planner.top_ants(3)], num_points=500)
+    times, _ = timeit(lambda: AnimationACO._interpolate_paths(animation), repeats)
+    return {'time': times}
+
+def parse_sizes(text):
+    return [[float(value) for value in size.split('x')] for size in text.split(',')]
+
+def parse_ints(text):
+    return [int(value) for value in text.split(',')]
+
+def run_benchmarks(args):
+    results = {}
+    for size in args.sizes:
+        name = f'{size[0]:g}x{size[1]:g}'
+        for n_ants in args.ants:
+            for n_iterations in args.iterations:
+                results[f'run_ACO_PSO[{name},ants={n_ants},iterations={n_iterations}]'] = \
+                    bench_planner(size, n_ants, n_iterations, args.repeats, args.seed)
+        results[f'possible_options_nodes[{name}]'] = bench_neighbors(size, args.repeats, args.seed)
+        results[f'actualization[{name},ants={max(args.ants)}]'] = bench_actualization(size, max(args.ants), args.repeats, args.seed)
+        results[f'_interpolate_paths[{name}]'] = bench_interpolation(size, max(args.ants), args.repeats, args.seed)
+    results['ParticleSwarmOptimizer.optimize'] = bench_swarm(ParticleSwarmOptimizer, args.repeats, args.seed)
+    results['SwarmOptimizer.optimize'] = bench_swarm(SwarmOptimizer, args.repeats, args.seed)
+    return results
+
+def compare(results, baseline, tolerance, min_delta=0.002, scale=1.0):
+    """
+    Print the changes against a baseline, returns the names of the regressions.
+
+    Args:
+        scale (float): Calibration time of this machine over the one of the baseline, the baseline
+                timings are multiplied by it so a slower machine is not reported as a regression.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            print(f'{name:70s} new')
+            continue
+        old = baseline[name]
+        expected = scale * old['time']['min']
+        ratio = result['time']['min'] / expected
+        line = f'{name:70s} time x{ratio:.2f}'
+        # Sub-millisecond timings are mostly noise, a slowdown must also be min_delta seconds long
+        regressed = ratio > 1 + tolerance and result['time']['min'] - expected > min_delta
+        if 'best_length' in result:
+            quality = result['best_length'] / old['best_length']
+            line += f'  length x{quality:.2f}'
+            regressed = regressed or quality > 1 + tolerance or (old['reached_goal'] and not result['reached_goal'])
+        if regressed:
+            regressions.append(name)
+            line += '  REGRESSION'
+        print(line)
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks of the ACO/PSO planner.')
+    parser.add_argument('--sizes', type=parse_sizes, default=parse_sizes('2x4,5x5,10x10'), help='Grid sizes, e.g. 2x4,5x5')
+    parser.add_argument('--ants', type=parse_ints, default=[25, 100], help='Ant counts, e.g. 25,100')
+    parser.add_argument('--iterations', type=parse_ints, default=[10], help='Iteration counts, e.g. 5,10')
+    parser.add_argument('--repeats', type=int, default=3, help='Repetitions of every timing')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of every planner and swarm')
+    parser.add_argument('--output', default='benchmark_results.json', help='JSON file with the results')
+    parser.add_argument('--baseline', default=BASELINE, help='JSON file of a previous run to compare against, '
+                        'an empty string skips the comparison')
+    parser.add_argument('--min-delta', type=float, default=0.002, help='Smallest slowdown (s) reported as a regression')
+    parser.add_argument('--update-baseline', action='store_true', help='Write the results to the baseline file')
+    parser.add_argument('--check', action='store_true', help='Exit with 1 when a regression is found')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed relative slowdown or length increase')
+    args = parser.parse_args(argv)
+
+    # Calibrated before and after the benchmarks, the faster run is less disturbed by the load of the machine
+    calibration = calibrate()
+    results = run_benchmarks(args)
+    calibration = min(calibration, calibrate())
+    report = {'python': platform.python_version(), 'numpy': np.__version__, 'calibration': calibration,
+              'seed': args.seed, 'repeats': args.repeats, 'results': results}
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump(report, file, indent=2)
+    if args.update_baseline or not args.baseline or not os.path.exists(args.baseline):
+        for name, result in results.items():
+            print(f'{name:70s} {1000 * result["time"]["median"]:10.2f} ms')
+        return 0
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    # Baselines without a calibration are compared with the raw timings
+    scale = calibration / baseline['calibration'] if 'calibration' in baseline else 1.0
+    print(f'Calibration {1000 * calibration:.2f} ms, timings of the baseline scaled by x{scale:.2f}')
+    regressions = compare(results, baseline['results'], args.tolerance, args.min_delta, scale)
+    return 1 if regressions and args.check else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
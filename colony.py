@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 11:05:27 2026
+
+@author: Rodolfo Alberto Reyes Corona
+"""
+
+import time
+import numpy as np
+
+def construct_colony(graph, pheromones, alpha, beta, start, goal, n_ants, max_step, rng, out=None, profiler=None, heuristic=None,
+                     tabu=False):
+    """
+    Build the paths of a whole colony, every ant advances one step at a time in lockstep.
+
+    Args:
+        graph (GridGraph): Grid graph of the search space.
+        pheromones (np.ndarray): Pheromone value of every edge of the graph.
+        alpha (float): Exponent on visibility (inverse of the edge length).
+        beta (float): Exponent on pheromone.
+        start (int): Node id where every ant starts.
+        goal (int): Node id that finishes the path of an ant, -1 if unreachable.
+        n_ants (int): Number of ants of the colony.
+        max_step (int): Maximum number of steps of an ant.
+        rng (np.random.Generator): Random generator used for the roulette selection.
+        out (tuple): Preallocated (paths, edges, n_steps, costs) buffers reused between iterations, optional.
+        profiler (PhaseProfiler): Receives the time of the neighbor expansion and sampling phases, optional.
+        heuristic (np.ndarray): Extra attractiveness factor of every edge, e.g. progress towards the goal, optional.
+        tabu (bool): An ant does not go back to a node of its own path. If every neighbor was visited,
+                the ant falls back to the plain rule and the loop is left to the post-processing.
+    Returns:
+        paths (np.ndarray): (n_ants, max_step + 1) node ids, -1 after the end of the path.
+        edges (np.ndarray): (n_ants, max_step) edge ids, -1 after the end of the path.
+        n_steps (np.ndarray): Number of steps done by every ant.
+        costs (np.ndarray): Length of the path of every ant.
+    """
+    if out is None:
+        paths = np.empty((n_ants, max_step + 1), dtype=np.int32)
+        edges = np.empty((n_ants, max_step), dtype=np.int32)
+        n_steps = np.empty(n_ants, dtype=np.int64)
+        costs = np.empty(n_ants)
+    else:
+        paths, edges, n_steps, costs = out
+    paths.fill(-1)
+    edges.fill(-1)
+    n_steps.fill(0)
+    costs.fill(0)
+    paths[:, 0] = start
+
+    # The attractiveness of an edge does not change while the colony is built
+    weights = (pheromones ** beta) * ((1 / graph.edge_lengths) ** alpha)
+    if heuristic is not None:
+        weights *= heuristic
+    weights = np.append(weights, 0.0)  # Index -1 (empty slot) has no weight
+
+    if tabu:
+        # One bit per (ant, node), the memory of a visited set for the whole colony
+        visited = np.zeros((n_ants, (graph.n_nodes + 7) // 8), dtype=np.uint8)
+        visited[:, start >> 3] |= np.uint8(1 << (start & 7))
+
+    current = np.full(n_ants, start, dtype=np.int64)
+    previous = np.full(n_ants, -1, dtype=np.int64)
+    active = np.arange(n_ants)
+    expansion_time = sampling_time = 0.0
+    lockstep = 0
+    for step in range(max_step):
+        if len(active) == 0:
+            break
+        if profiler is not None:
+            expansion_start = time.perf_counter()
+        node = current[active]
+        candidates = graph.neighbor_table[node]
+        candidate_edges = graph.edge_table[node]
+        probabilities = weights[candidate_edges]
+
+        # Avoid going back to the previous node, unless it is the only option
+        if step > 1:
+            forward = np.where(candidates == previous[active, None], 0.0, probabilities)
+            blocked = forward.sum(axis=1) == 0
+            probabilities = np.where(blocked[:, None], probabilities, forward)
+        if tabu:
+            seen = visited[active[:, None], candidates >> 3] & (1 << (candidates & 7)).astype(np.uint8)
+            fresh = np.where(seen > 0, 0.0, probabilities)
+            trapped = fresh.sum(axis=1) == 0
+            probabilities = np.where(trapped[:, None], probabilities, fresh)
+
+        if profiler is not None:
+            sampling_start = time.perf_counter()
+            expansion_time += sampling_start - expansion_start
+
+        # Roulette selection for every ant at once
+        cumulative_prob = np.cumsum(probabilities, axis=1)
+        stuck = cumulative_prob[:, -1] == 0 if graph.max_degree else np.ones(len(active), dtype=bool)
+        if stuck.any():
+            # A node without free neighbors, the ant can not finish its path
+            costs[active[stuck]] = np.inf
+            active, node = active[~stuck], node[~stuck]
+            candidates, candidate_edges = candidates[~stuck], candidate_edges[~stuck]
+            cumulative_prob = cumulative_prob[~stuck]
+            if len(active) == 0:
+                break
+        threshold = rng.random(len(active)) * cumulative_prob[:, -1]
+        choice = (cumulative_prob <= threshold[:, None]).sum(axis=1)
+        choice = np.minimum(choice, graph.max_degree - 1)
+        rows = np.arange(len(active))
+        new_node = candidates[rows, choice]
+        new_edge = candidate_edges[rows, choice]
+
+        paths[active, step + 1] = new_node
+        edges[active, step] = new_edge
+        costs[active] += graph.edge_lengths[new_edge]
+        n_steps[active] = step + 1
+        previous[active] = node
+        current[active] = new_node
+        if tabu:
+            visited[active, new_node >> 3] |= (1 << (new_node & 7)).astype(np.uint8)
+        active = active[new_node != goal]
+        if profiler is not None:
+            sampling_time += time.perf_counter() - sampling_start
+            lockstep += 1
+
+    if profiler is not None:
+        profiler.add_time('neighbor_expansion', expansion_time, lockstep)
+        profiler.add_time('sampling', sampling_time, lockstep)
+    return paths, edges, n_steps, costs
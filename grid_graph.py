@@ -0,0 +1,361 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 10:12:41 2026
+
+@author: Rodolfo Alberto Reyes Corona
+"""
+
+import copy
+import hashlib
+import os
+import numpy as np
+
+def load_occupancy(filename, threshold=0.5):
+    """
+    Read an occupancy map, row 0 of the result is the row with the lowest y.
+
+    Args:
+        filename (str): .npy file (values >= threshold are occupied) or image (dark pixels are occupied).
+        threshold (float): Occupancy threshold, the image intensity is normalized to [0, 1].
+    Returns:
+        occupied (np.ndarray): Boolean (rows, cols) array, True for the blocked cells.
+    """
+    if os.path.splitext(filename)[1].lower() == '.npy':
+        return np.load(filename) >= threshold
+    import matplotlib.image as mpimg
+
+    image = np.asarray(mpimg.imread(filename), dtype=float)
+    if image.ndim == 3:
+        image = image[..., :3].mean(axis=2)
+    if image.max() > 1:
+        image /= 255
+    # The first row of an image is the top of the map
+    return np.flipud(image < threshold)
+
+def downsample(occupied, factor):
+    """A coarse cell is blocked if any of the factor x factor cells it covers is blocked."""
+    if factor == 1:
+        return occupied
+    rows, cols = occupied.shape
+    padded = np.zeros((-(-rows // factor) * factor, -(-cols // factor) * factor), dtype=bool)
+    padded[:rows, :cols] = occupied
+    return padded.reshape(padded.shape[0] // factor, factor, padded.shape[1] // factor, factor).any(axis=(1, 3))
+
+class GridGraph:
+    def __init__(self, size=None, resolution=0.5, radius=0.8, free=None, origin=(0, 0)):
+        """
+        Grid graph of the search space, built once and stored in CSR form.
+
+        Only the free cells are nodes, so memory and neighbor lookups scale with the free cells
+        and the number of neighbors, not with the bounding rectangle.
+
+        Args:
+            size (list): Width and height of the quad area, not needed when free is given.
+            resolution (float): Distance between two consecutive nodes of the grid.
+            radius (float): Maximum distance between two connected nodes.
+            free (np.ndarray): Boolean (rows, cols) mask of the free cells, None for an empty area.
+            origin (list): World coordinates of the cell (0, 0).
+        Example:
+            graph = GridGraph([2, 4])
+            graph.neighbors(graph.node_index([0, 0]))
+        """
+        self.resolution = resolution
+        self.radius = radius
+        self.origin = (float(origin[0]), float(origin[1]))
+        if free is None:
+            cols = len(np.arange(0, size[0] + 0.01, self.resolution))
+            rows = len(np.arange(0, size[1] + 0.01, self.resolution))
+            self.shape = (rows, cols)
+            self.cells = np.arange(rows * cols, dtype=np.int64)
+        else:
+            free = np.asarray(free, dtype=bool)
+            self.shape = free.shape
+            # Sorted flat index of every free cell, the position in this array is the node id
+            self.cells = np.flatnonzero(free)
+        rows, cols = self.shape
+        self.size = size if size is not None else [(cols - 1) * self.resolution, (rows - 1) * self.resolution]
+
+        # Node ids follow the row-major order of the grid
+        i, j = np.divmod(self.cells, cols)
+        self.coordinates = np.column_stack((self.origin[0] + j * self.resolution,
+                                            self.origin[1] + i * self.resolution))
+        self.n_nodes = len(self.cells)
+        self.edge_digest = None
+        self._build_edges()
+
+    @classmethod
+    def from_file(cls, filename, resolution, map_resolution=None, radius=None, threshold=0.5, origin=(0, 0)):
+        """
+        Grid graph of an occupancy map.
+
+        Args:
+            filename (str): .npy file or image of the map, see load_occupancy.
+            resolution (float): Distance between two nodes of the graph.
+            map_resolution (float): Size of a cell of the map, None if it is the same as resolution.
+            radius (float): Connection radius, None connects the 8 closest cells.
+            threshold (float): Occupancy threshold.
+            origin (list): World coordinates of the cell (0, 0).
+        Example:
+            graph = GridGraph.from_file('floor.png', 0.5, map_resolution=0.05)
+        """
+        occupied = load_occupancy(filename, threshold)
+        map_resolution = map_resolution if map_resolution is not None else resolution
+        factor = int(round(resolution / map_resolution))
+        if factor < 1 or not np.isclose(factor * map_resolution, resolution):
+            raise ValueError(f'The resolution {resolution} must be a multiple of the map resolution {map_resolution}')
+        radius = radius if radius is not None else 1.6 * resolution
+        return cls(resolution=resolution, radius=radius, free=~downsample(occupied, factor), origin=origin)
+
+    def _stencil(self):
+        # Offsets (in cells) of every node inside the connection radius
+        reach = int(self.radius // self.resolution)
+        di, dj = np.mgrid[-reach:reach + 1, -reach:reach + 1]
+        di, dj = di.ravel(), dj.ravel()
+        distance = self.resolution * np.sqrt(di ** 2 + dj ** 2)
+        keep = (distance > 0) & (distance <= self.radius)
+        return di[keep], dj[keep]
+
+    @staticmethod
+    def segment_cells(di, dj):
+        """Offsets of the cells crossed by the segment (0, 0) -> (di, dj), without its endpoints."""
+        t = np.linspace(0, 1, 8 * (abs(di) + abs(dj)) + 1)
+        a, b = di * t, dj * t
+        # A segment that touches the corner of a cell counts as crossing it
+        rows = (np.floor(a + 0.5), np.ceil(a - 0.5))
+        cols = (np.floor(b + 0.5), np.ceil(b - 0.5))
+        crossed = np.unique(np.concatenate([np.column_stack((r, c)) for r in rows for c in cols]).astype(np.int64), axis=0)
+        keep = ~(((crossed[:, 0] == 0) & (crossed[:, 1] == 0)) | ((crossed[:, 0] == di) & (crossed[:, 1] == dj)))
+        return [tuple(cell) for cell in crossed[keep].tolist()]
+
+    def line_of_sight(self, source, target):
+        """True if the straight segment between two nodes only crosses free cells."""
+        cols = self.shape[1]
+        i0, j0 = divmod(int(self.cells[source]), cols)
+        i1, j1 = divmod(int(self.cells[target]), cols)
+        crossed = np.array(self.segment_cells(i1 - i0, j1 - j0), dtype=np.int64).reshape(-1, 2)
+        return bool((self.cell_nodes(i0 + crossed[:, 0], j0 + crossed[:, 1]) >= 0).all())
+
+    def cell_nodes(self, i, j):
+        """Node id of the cells (i, j), -1 for blocked cells or cells outside the grid."""
+        i, j = np.asarray(i), np.asarray(j)
+        if self.n_nodes == 0:
+            return np.full(np.broadcast(i, j).shape, -1)
+        rows, cols = self.shape
+        inside = (i >= 0) & (i < rows) & (j >= 0) & (j < cols)
+        flat = np.where(inside, i * cols + j, -1)
+        position = np.minimum(np.searchsorted(self.cells, flat), self.n_nodes - 1)
+        return np.where(inside & (self.cells[position] == flat), position, -1)
+
+    def _build_edges(self):
+        self._set_edges(*self._stencil_edges(np.arange(self.n_nodes)))
+
+    def _stencil_edges(self, nodes):
+        # Edges (source, target) leaving the given nodes, sorted by source and target
+        i, j = np.divmod(self.cells[nodes], self.shape[1])
+        sources, targets = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)]
+        for di, dj in zip(*self._stencil()):
+            target = self.cell_nodes(i + di, j + dj)
+            valid = target >= 0
+            # Moves are not allowed to cut through a blocked cell
+            for ci, cj in self.segment_cells(di, dj):
+                valid &= self.cell_nodes(i + ci, j + cj) >= 0
+            sources.append(nodes[valid])
+            targets.append(target[valid])
+        sources = np.concatenate(sources).astype(np.int32)
+        targets = np.concatenate(targets).astype(np.int32)
+
+        # Sorting by (source, target) keeps the neighbor order of a full-mesh scan
+        order = np.lexsort((targets, sources))
+        return sources[order], targets[order]
+
+    def _set_edges(self, sources, targets, edge_lengths=None):
+        self.sources = sources
+        self.indices = targets
+        self.indptr = np.zeros(self.n_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.sources, minlength=self.n_nodes), out=self.indptr[1:])
+        if edge_lengths is None:
+            delta = self.coordinates[self.indices] - self.coordinates[self.sources]
+            edge_lengths = np.sqrt((delta ** 2).sum(axis=1))
+        self.edge_lengths = edge_lengths
+        self.n_edges = len(self.indices)
+
+        # Padded (n_nodes, max_degree) copies of the adjacency, -1 marks an empty slot.
+        # They let a whole colony gather its candidates with a single fancy index.
+        degree = np.diff(self.indptr)
+        self.max_degree = int(degree.max()) if self.n_nodes else 0
+        # The edges are sorted by source, so they fill the used slots of the tables in row-major order
+        used = np.arange(self.max_degree) < degree[:, None]
+        self.neighbor_table = np.full((self.n_nodes, self.max_degree), -1, dtype=np.int32)
+        self.edge_table = np.full((self.n_nodes, self.max_degree), -1, dtype=np.int32)
+        self.neighbor_table[used] = self.indices
+        self.edge_table[used] = np.arange(self.n_edges)
+
+    def geometry_key(self):
+        """JSON-friendly description of the grid, two graphs with the same key share node and edge ids."""
+        key = [[float(value) for value in self.size], float(self.resolution), float(self.radius), list(self.origin)]
+        if self.n_nodes != self.shape[0] * self.shape[1]:
+            key.append(hashlib.sha1(self.cells.tobytes()).hexdigest())
+        if self.edge_digest is not None:
+            key.append(self.edge_digest)
+        return key
+
+    def free_mask(self):
+        """Boolean (rows, cols) mask of the free cells."""
+        free = np.zeros(self.shape[0] * self.shape[1], dtype=bool)
+        free[self.cells] = True
+        return free.reshape(self.shape)
+
+    def pruned(self, keep):
+        """
+        Copy of the graph with only some of its edges, e.g. the coarse edges that do not cross a thin wall.
+
+        Args:
+            keep (np.ndarray): Boolean mask of the edges kept, it must keep the graph symmetric.
+        """
+        keep = np.asarray(keep, dtype=bool)
+        graph = copy.copy(self)
+        graph._set_edges(self.sources[keep], self.indices[keep], self.edge_lengths[keep])
+        digest = hashlib.sha1(np.packbits(keep).tobytes())
+        if self.edge_digest is not None:
+            digest.update(self.edge_digest.encode())
+        graph.edge_digest = digest.hexdigest()
+        return graph
+
+    def updated(self, blocked=None, freed=None, return_maps=False):
+        """
+        Copy of the graph after some cells change, e.g. an obstacle tracked by the Vicon moved.
+
+        Only the edges leaving the nodes within the connection radius of a changed cell are built again,
+        every other edge is copied and keeps its order, its id only moves by the edges removed or added before it.
+
+        Args:
+            blocked (list): Points (x, y) whose cells become blocked, points outside the grid are ignored.
+            freed (list): Points (x, y) whose cells become free.
+            return_maps (bool): Also return the maps between the ids of both graphs.
+        Returns:
+            graph (GridGraph): New graph, use edge_map and node_map to move data between both graphs.
+            node_map (np.ndarray): Node id in the new graph of every node, -1 if it was blocked. Only with return_maps.
+            edge_map (np.ndarray): Edge id in the new graph of every edge, -1 if it was removed. Only with return_maps.
+            touched (np.ndarray): Nodes of the new graph whose edges were built again. Only with return_maps.
+        """
+        before = self.free_mask()
+        free = before.copy()
+        for points, value in ((freed, True), (blocked, False)):
+            if points is None or len(points) == 0:
+                continue
+            points = np.asarray(points, dtype=float).reshape(-1, 2)
+            j = np.round((points[:, 0] - self.origin[0]) / self.resolution).astype(np.int64)
+            i = np.round((points[:, 1] - self.origin[1]) / self.resolution).astype(np.int64)
+            inside = (i >= 0) & (i < self.shape[0]) & (j >= 0) & (j < self.shape[1])
+            free[i[inside], j[inside]] = value
+
+        # An edge can only change if its source is within the reach of the stencil from a changed cell
+        reach = int(self.radius // self.resolution)
+        near = before != free
+        for axis in (0, 1):
+            grown = near.copy()
+            for shift in range(1, reach + 1):
+                if axis == 0:
+                    grown[shift:] |= near[:-shift]
+                    grown[:-shift] |= near[shift:]
+                else:
+                    grown[:, shift:] |= near[:, :-shift]
+                    grown[:, :-shift] |= near[:, shift:]
+            near = grown
+        near = near.ravel()
+
+        graph = copy.copy(self)
+        graph.cells = np.flatnonzero(free)
+        i, j = np.divmod(graph.cells, self.shape[1])
+        graph.coordinates = np.column_stack((self.origin[0] + j * self.resolution,
+                                             self.origin[1] + i * self.resolution))
+        graph.n_nodes = len(graph.cells)
+        node_map = self.node_map(graph)
+
+        # Node ids keep the row-major order and every source either keeps all its edges or builds them again,
+        # so the edges of a node are copied as a block to its new position
+        degree = np.diff(self.indptr)
+        kept_nodes = ~near[self.cells]
+        kept = np.repeat(kept_nodes, degree)
+        touched = np.flatnonzero(near[graph.cells])
+        new_sources, new_targets = graph._stencil_edges(touched)
+        new_degree = np.zeros(graph.n_nodes, dtype=np.int64)
+        new_degree[node_map[kept_nodes]] = degree[kept_nodes]
+        new_degree[touched] = np.bincount(new_sources, minlength=graph.n_nodes)[touched]
+        copied = np.repeat(~near[graph.cells], new_degree)
+        inserted = np.flatnonzero(~copied)
+        targets = np.empty(len(copied), dtype=np.int32)
+        targets[copied] = node_map[self.indices[kept]]
+        targets[inserted] = new_targets
+        edge_lengths = np.empty(len(copied))
+        edge_lengths[copied] = self.edge_lengths[kept]
+        delta = graph.coordinates[new_targets] - graph.coordinates[new_sources]
+        edge_lengths[inserted] = np.sqrt((delta ** 2).sum(axis=1))
+        graph._set_edges(np.repeat(np.arange(graph.n_nodes, dtype=np.int32), new_degree), targets, edge_lengths)
+        if not return_maps:
+            return graph
+
+        edge_map = np.full(self.n_edges, -1, dtype=np.int64)
+        edge_map[kept] = np.flatnonzero(copied)
+        # The edges built again that already existed take the id of their new copy
+        rebuilt = np.flatnonzero(~kept)
+        if len(rebuilt) and len(inserted):
+            new_keys = new_sources.astype(np.int64) * graph.n_nodes + new_targets
+            source, target = node_map[self.sources[rebuilt]], node_map[self.indices[rebuilt]]
+            keys = source.astype(np.int64) * graph.n_nodes + target
+            position = np.minimum(np.searchsorted(new_keys, keys), len(new_keys) - 1)
+            found = (source >= 0) & (target >= 0) & (new_keys[position] == keys)
+            edge_map[rebuilt[found]] = inserted[position[found]]
+        return graph, node_map, edge_map, touched
+
+    def edge_keys(self):
+        # Flat (source cell, target cell) pair of every edge, sorted like the edge ids
+        return self.cells[self.sources] * (self.shape[0] * self.shape[1]) + self.cells[self.indices]
+
+    def edge_map(self, other):
+        """Edge id in other of every edge of this graph, -1 for the edges other does not have."""
+        keys, other_keys = self.edge_keys(), other.edge_keys()
+        if other.n_edges == 0:
+            return np.full(self.n_edges, -1, dtype=np.int64)
+        position = np.minimum(np.searchsorted(other_keys, keys), other.n_edges - 1)
+        return np.where(other_keys[position] == keys, position, -1)
+
+    def node_map(self, other):
+        """Node id in other of every node of this graph, -1 for the nodes other does not have."""
+        i, j = np.divmod(self.cells, self.shape[1])
+        return other.cell_nodes(i, j)
+
+    def node_index(self, point):
+        """Node id of a point of the grid, -1 if the point is not a free node."""
+        j = int(round((point[0] - self.origin[0]) / self.resolution))
+        i = int(round((point[1] - self.origin[1]) / self.resolution))
+        node = int(self.cell_nodes(i, j))
+        if node < 0 or not np.allclose(self.coordinates[node], point[:2]):
+            return -1
+        return node
+
+    def nearest_node(self, point):
+        """Closest free node to any point of the plane."""
+        j = int(round((point[0] - self.origin[0]) / self.resolution))
+        i = int(round((point[1] - self.origin[1]) / self.resolution))
+        node = int(self.cell_nodes(i, j))
+        if node >= 0:
+            return node
+        return int(np.argmin(((self.coordinates - np.asarray(point[:2], dtype=float)) ** 2).sum(axis=1)))
+
+    def neighbors(self, node):
+        """Node ids connected to node, in O(degree)."""
+        return self.indices[self.indptr[node]:self.indptr[node + 1]]
+
+    def edges(self, node):
+        """Edge ids leaving node, aligned with neighbors(node)."""
+        return np.arange(self.indptr[node], self.indptr[node + 1])
+
+    def edge_index(self, source, target):
+        """Edge id of the route source -> target, -1 if they are not connected."""
+        start = self.indptr[source]
+        neighbors = self.neighbors(source)
+        position = np.searchsorted(neighbors, target)
+        if position < len(neighbors) and neighbors[position] == target:
+            return int(start + position)
+        return -1
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 19:03:48 2026
+
+@author: Rodolfo Alberto Reyes Corona
+"""
+
+import time
+import numpy as np
+from aco_pso import ACO_PSO
+from grid_graph import GridGraph, downsample, load_occupancy
+from path_tools import path_length, remove_loops
+from shortest_path import astar, dijkstra
+
+def corridor_mask(shape, resolution, origin, path, width):
+    """
+    Cells of a grid whose distance to a polyline is at most width.
+
+    Only the bounding box of every segment is visited, so the cost grows with the path length.
+    """
+    rows, cols = shape
+    mask = np.zeros(shape, dtype=bool)
+    points = (np.asarray(path, dtype=float) - origin) / resolution
+    reach = width / resolution
+    if len(points) == 1:
+        points = np.vstack((points, points))
+    for (x0, y0), (x1, y1) in zip(points[:-1], points[1:]):
+        j0, j1 = max(int(np.floor(min(x0, x1) - reach)), 0), min(int(np.ceil(max(x0, x1) + reach)), cols - 1)
+        i0, i1 = max(int(np.floor(min(y0, y1) - reach)), 0), min(int(np.ceil(max(y0, y1) + reach)), rows - 1)
+        if j0 > j1 or i0 > i1:
+            continue
+        j, i = np.meshgrid(np.arange(j0, j1 + 1), np.arange(i0, i1 + 1))
+        dx, dy = x1 - x0, y1 - y0
+        squared = dx ** 2 + dy ** 2
+        t = np.clip(((j - x0) * dx + (i - y0) * dy) / squared, 0, 1) if squared > 0 else 0
+        distance = np.hypot(j - (x0 + t * dx), i - (y0 + t * dy))
+        mask[i0:i1 + 1, j0:j1 + 1] |= distance <= reach
+    return mask
+
+def path_progress(points, path):
+    """Arc length along a polyline of the closest point of the polyline to every point."""
+    start, end = path[:-1], path[1:]
+    delta = end - start
+    lengths = np.sqrt((delta ** 2).sum(axis=1))
+    offsets = np.concatenate(([0], np.cumsum(lengths)))[:-1]
+    progress = np.zeros(len(points))
+    closest = np.full(len(points), np.inf)
+    # One segment at a time keeps the memory linear in the number of points
+    for a, d, length, offset in zip(start, delta, lengths, offsets):
+        t = np.clip(((points - a) @ d) / length ** 2, 0, 1) if length > 0 else np.zeros(len(points))
+        distance = ((a + t[:, None] * d - points) ** 2).sum(axis=1)
+        better = distance < closest
+        closest[better] = distance[better]
+        progress[better] = offset + t[better] * length
+    return progress
+
+def coarse_free(occupied, factor):
+    """A coarse cell is free if any of the cells it covers is free, the finer levels check the details."""
+    if factor == 1:
+        return ~occupied
+    rows, cols = occupied.shape
+    padded = np.ones((-(-rows // factor) * factor, -(-cols // factor) * factor), dtype=bool)
+    padded[:rows, :cols] = occupied
+    blocked = padded.reshape(padded.shape[0] // factor, factor, padded.shape[1] // factor, factor).all(axis=(1, 3))
+    return ~blocked
+
+def wall_free_edges(graph, occupied, factor):
+    """
+    Edges of a coarse graph that do not cross a blocked fine cell.
+
+    Every coarse cell is represented by its free fine cell closest to its center, an edge is kept if the
+    segment between the representatives of both cells only crosses free fine cells. A coarse cell is free
+    if any fine cell is free, so without this check a wall thinner than a coarse cell would vanish.
+
+    Returns:
+        keep (np.ndarray): Boolean mask of the edges of graph, see GridGraph.pruned.
+    """
+    fine_free = ~occupied
+    i, j = np.nonzero(fine_free)
+    blocks = (i // factor) * graph.shape[1] + j // factor
+    center = (factor - 1) / 2
+    order = np.lexsort(((i % factor - center) ** 2 + (j % factor - center) ** 2, blocks))
+    blocks, first = np.unique(blocks[order], return_index=True)
+    representative = order[first][np.searchsorted(blocks, graph.cells)]
+    rows, cols = i[representative].astype(float), j[representative].astype(float)
+
+    di = rows[graph.indices] - rows[graph.sources]
+    dj = cols[graph.indices] - cols[graph.sources]
+    keep = np.ones(graph.n_edges, dtype=bool)
+    # Same supercover as GridGraph.segment_cells, a segment that touches the corner of a cell crosses it
+    for t in np.linspace(0, 1, 8 * 2 * factor + 1):
+        a = rows[graph.sources] + t * di
+        b = cols[graph.sources] + t * dj
+        for r in (np.floor(a + 0.5), np.ceil(a - 0.5)):
+            for c in (np.floor(b + 0.5), np.ceil(b - 0.5)):
+                keep &= fine_free[r.astype(np.int64), c.astype(np.int64)]
+    return keep
+
+class HierarchicalPlanner:
+    def __init__(self, initial_point, final_point, n_ants, n_iterations, occupied, resolution,
+                 factors=(8, 4, 2, 1), corridor=1.5, seed_pheromone=1.0, patience=None, seed=None, origin=(0, 0),
+                 planner_options=None):
+        """
+        Coarse-to-fine ACO/PSO: the colony first runs on a downsampled grid, the finer levels
+        only search a corridor around the best path of the level above. Where the corridor is cut,
+        only the cut stretch is widened, and a coarse level that can not connect both points is skipped.
+
+        Args:
+            initial_point (list): Bidimensional initial point, a free node of the finest grid.
+            final_point (list): Bidimensional final point, a free node of the finest grid.
+            n_ants (int): Number of ants per iteration of every level.
+            n_iterations (int): Maximum number of iterations of every level.
+            occupied (np.ndarray): Boolean (rows, cols) occupancy of the finest grid, True for blocked cells.
+            resolution (float): Distance between two nodes of the finest grid.
+            factors (tuple): Downsampling factor of every level, from the coarsest to the finest (1).
+            corridor (float): Half width of the corridor searched around the path of the level above,
+                    in cells of the level above.
+            seed_pheromone (float): Initial pheromone of the edges moving forward along the path of the level above.
+            patience (int): Iterations without improvement before a level stops, None runs every iteration.
+            seed (int): Seed of the first level, the next levels use consecutive seeds.
+            origin (list): World coordinates of the cell (0, 0).
+            planner_options (dict): Extra keyword arguments of the ACO_PSO of every level, e.g. heuristic_weight.
+        Example:
+            planner = HierarchicalPlanner.from_file([1,1], [180,95], 50, 20, 'floor.png', 0.5, map_resolution=0.05)
+            planner.run()
+            planner.best_path, planner.best_length
+        """
+        self.initial_point = initial_point
+        self.final_point = final_point
+        self.n_ants = n_ants
+        self.n_iterations = n_iterations
+        self.occupied = np.asarray(occupied, dtype=bool)
+        self.resolution = resolution
+        self.factors = factors
+        self.corridor = corridor
+        self.seed_pheromone = seed_pheromone
+        self.patience = patience
+        self.seed = seed
+        self.origin = np.asarray(origin, dtype=float)
+        self.planner_options = planner_options if planner_options is not None else {}
+        self.best_path = None
+        self.best_length = np.inf
+        self.levels = []
+
+    @classmethod
+    def from_file(cls, initial_point, final_point, n_ants, n_iterations, filename, resolution,
+                  map_resolution=None, threshold=0.5, **kwargs):
+        occupied = load_occupancy(filename, threshold)
+        if map_resolution is not None:
+            occupied = downsample(occupied, int(round(resolution / map_resolution)))
+        return cls(initial_point, final_point, n_ants, n_iterations, occupied, resolution, **kwargs)
+
+    @classmethod
+    def from_size(cls, initial_point, final_point, n_ants, n_iterations, size, resolution=0.5, **kwargs):
+        """Empty quad area, like ACO_PSO."""
+        shape = (len(np.arange(0, size[1] + 0.01, resolution)), len(np.arange(0, size[0] + 0.01, resolution)))
+        return cls(initial_point, final_point, n_ants, n_iterations, np.zeros(shape, dtype=bool), resolution, **kwargs)
+
+    def level_planner(self, factor, path, corridor, previous, widened=()):
+        resolution = self.resolution * factor
+        free = coarse_free(self.occupied, factor)
+        if path is not None:
+            allowed = corridor_mask(free.shape, resolution, self.origin, path, corridor)
+            for stretch, width in widened:
+                allowed |= corridor_mask(free.shape, resolution, self.origin, stretch, width)
+            free &= allowed
+        graph = GridGraph(resolution=resolution, radius=1.6 * resolution, free=free, origin=self.origin)
+        if graph.n_nodes == 0:
+            return None
+        if factor > 1:
+            graph = graph.pruned(wall_free_edges(graph, self.occupied, factor))
+
+        if factor == 1:
+            initial_point, final_point = self.initial_point, self.final_point
+        else:
+            initial_point = list(graph.coordinates[graph.nearest_node(self.initial_point)])
+            final_point = list(graph.coordinates[graph.nearest_node(self.final_point)])
+        seed = None if self.seed is None else self.seed + len(self.levels)
+        planner = ACO_PSO(initial_point, final_point, self.n_ants, self.n_iterations, None, seed=seed, graph=graph,
+                          **self.planner_options)
+        # The ants only need enough steps to follow the corridor
+        if path is None:
+            planner.max_step = max(planner.max_step, 2 * sum(free.shape))
+        else:
+            planner.max_step = int(4 * previous.best_length / resolution) + 20
+        if previous is not None:
+            self.seed_pheromones(planner, previous)
+        return planner
+
+    def failing_stretch(self, planner, path):
+        """Part of the path of the level above between the last point reached from the start and the goal."""
+        path = np.asarray(path, dtype=float)
+        if planner is None:
+            return path
+        graph = planner.graph
+        start = graph.node_index(planner.initial_point)
+        goal = graph.node_index(planner.final_point)
+        if start < 0 or goal < 0:
+            return path
+        nodes = [graph.nearest_node(point) for point in path]
+        from_start = np.isfinite(dijkstra(graph, start)[0])[nodes]
+        from_goal = np.isfinite(dijkstra(graph, goal)[0])[nodes]
+        last = int(np.flatnonzero(from_goal)[0]) if from_goal.any() else len(path) - 1
+        first = int(np.flatnonzero(from_start[:last + 1])[-1]) if from_start[:last + 1].any() else 0
+        return path[first:last + 1]
+
+    def seed_pheromones(self, planner, previous):
+        # Edges that move forward along the path of the level above start with a high pheromone,
+        # so the ants follow the corridor instead of wandering. alpha/beta are also inherited.
+        graph = planner.graph
+        progress = path_progress(graph.coordinates, previous.graph.coordinates[previous.best_nodes])
+        forward = progress[graph.indices] > progress[graph.sources]
+        planner.pheromones[forward] = self.seed_pheromone
+        planner.visited_routes[forward] = True
+        planner.alpha, planner.beta = previous.alpha, previous.beta
+
+    def run(self, verbose=False):
+        for point in (self.initial_point, self.final_point):
+            j, i = np.round((np.asarray(point[:2], dtype=float) - self.origin) / self.resolution).astype(int)
+            if not (0 <= i < self.occupied.shape[0] and 0 <= j < self.occupied.shape[1]) or self.occupied[i, j]:
+                raise ValueError(f'The point {point} is not a free cell of the map')
+        path, previous = None, None
+        for factor in self.factors:
+            start = time.perf_counter()
+            corridor = self.corridor * (previous.graph.resolution if previous is not None else 0)
+            # Stretches of the path above whose corridor is widened, only where the corridor is cut
+            widened = []
+            while True:
+                planner = self.level_planner(factor, path, corridor, previous, widened)
+                shortest_nodes = None
+                if planner is not None:
+                    start_node = planner.graph.node_index(planner.initial_point)
+                    goal = planner.graph.node_index(planner.final_point)
+                    if start_node >= 0 and goal >= 0:
+                        shortest_nodes, shortest_length = astar(planner.graph, start_node, goal)
+                if shortest_nodes is not None or path is None:
+                    break
+                width = 2 * (widened[-1][1] if widened else corridor)
+                if width > self.resolution * sum(self.occupied.shape):
+                    raise ValueError(f'No path found at the level with factor {factor}')
+                widened.append((self.failing_stretch(planner, path), width))
+            if shortest_nodes is None:
+                if factor == 1:
+                    raise ValueError(f'No path from {self.initial_point} to {self.final_point}')
+                # The coarse cells do not connect both points, the next level starts without a corridor
+                continue
+
+            for snapshot in planner.iterate_ACO_PSO(patience=self.patience):
+                pass
+            if planner.best_nodes is None or planner.best_nodes[-1] != goal:
+                # The colony did not reach the goal, the exact path of the level guides the next one
+                planner.best_nodes, planner.best_length = shortest_nodes, shortest_length
+            # The loops of the random walk would only widen the corridor of the next level
+            planner.best_nodes = remove_loops(planner.best_nodes)
+            planner.best_length = path_length(planner.graph.coordinates[planner.best_nodes])
+            path, previous = planner.best_path, planner
+            self.levels.append({'factor': factor, 'resolution': planner.graph.resolution,
+                                'nodes': planner.graph.n_nodes, 'corridor': corridor, 'widened': len(widened),
+                                'best_length': float(planner.best_length), 'time': time.perf_counter() - start})
+            if verbose:
+                print(f'Level x{factor}: {planner.graph.n_nodes} nodes, length {planner.best_length:.2f}')
+        self.planner = previous
+        self.best_path = previous.best_path
+        self.best_length = previous.best_length
+        return self.best_path
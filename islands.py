@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 13:41:09 2026
+
+@author: Rodolfo Alberto Reyes Corona
+"""
+
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import os
+from queue import Empty
+import numpy as np
+from aco_pso import ACO_PSO
+
+def _attach(name, shape, dtype):
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+def _island_worker(index, problem, seed, exchange_interval, blend, names, shapes, barrier, queue):
+    initial_point, final_point, n_ants, n_iterations, size, tuning, graph = problem
+    planner = ACO_PSO(initial_point, final_point, n_ants, n_iterations, size, seed=seed, tuning=tuning, n_workers=1,
+                      graph=graph)
+    blocks = [_attach(name, shape, dtype) for name, (shape, dtype) in zip(names, shapes)]
+    pheromones, visited, lengths, paths = [array for shm, array in blocks]
+
+    planner.initialize_ants()
+    try:
+        for it in range(n_iterations):
+            planner.run_iteration(it)
+            if (it + 1) % exchange_interval or it + 1 == n_iterations:
+                continue
+            # Publish the state of this island
+            pheromones[index] = planner.pheromones
+            visited[index] = planner.visited_routes
+            lengths[index] = planner.best_length
+            paths[index] = -1
+            if planner.best_nodes is not None:
+                paths[index, :len(planner.best_nodes)] = planner.best_nodes
+            barrier.wait()
+
+            # Blend the pheromones with the island that owns the best path
+            best = int(np.argmin(lengths))
+            if best != index and np.isfinite(lengths[best]):
+                planner.pheromones *= (1 - blend)
+                planner.pheromones += blend * pheromones[best]
+                planner.visited_routes |= visited[best]
+                planner.best_length = lengths[best]
+                planner.best_nodes = paths[best][paths[best] >= 0].copy()
+            barrier.wait()
+        queue.put((index, planner.ants, planner.best_path, planner.best_length))
+    finally:
+        planner.close()
+        for shm, array in blocks:
+            shm.close()
+
+class IslandModel:
+    def __init__(self, initial_point, final_point, n_ants, n_iterations, size, n_islands=None,
+                 exchange_interval=5, blend=0.5, seed=None, tuning='static', graph=None):
+        """
+        Several independently seeded ACO_PSO colonies running in worker processes.
+
+        Args:
+            initial_point (list): Bidimensional initial point
+            final_point (list): Bidimensional final point
+            n_ants (int): Number of ants per island and iteration
+            n_iterations (int): Number of iterations of every island
+            size (list): Size of the quad area, shared by every island.
+            n_islands (int): Number of colonies, None for one per core.
+            exchange_interval (int): Iterations between two exchanges of pheromones and best paths.
+            blend (float): Weight of the best island pheromones when they are blended in the others.
+            seed (int): Seed used to derive the seed of every island.
+            tuning (str): Tuning mode of the alpha/beta PSO of every island.
+            graph (GridGraph): Search space shared by every island, None for the empty grid of size.
+        Example:
+            islands = IslandModel([0,0], [5,5], 100, 20, [5,5], n_islands=8)
+            ants = islands.run()
+            islands.best_path, islands.best_length
+        Scripts using the island model must guard their entry point with if __name__ == '__main__'.
+        """
+        self.initial_point = initial_point
+        self.final_point = final_point
+        self.n_ants = n_ants
+        self.n_iterations = n_iterations
+        self.size = size
+        self.n_islands = n_islands if n_islands is not None else os.cpu_count()
+        self.exchange_interval = exchange_interval
+        self.blend = blend
+        self.seed = seed
+        self.tuning = tuning
+        self.graph = graph
+        self.best_path = None
+        self.best_length = np.inf
+        self.results = []
+
+    def _collect(self, queue, workers):
+        results = []
+        while len(results) < len(workers):
+            try:
+                results.append(queue.get(timeout=1))
+            except Empty:
+                if any(worker.exitcode not in (None, 0) for worker in workers):
+                    for worker in workers:
+                        worker.terminate()
+                    raise RuntimeError('An island worker failed')
+        return results
+
+    def run(self):
+        # Only the shape of the shared buffers is needed, every worker builds the same grid
+        planner = ACO_PSO(self.initial_point, self.final_point, 1, 1, self.size, graph=self.graph)
+        n_edges, max_step = planner.graph.n_edges, planner.max_step
+        shapes = [((self.n_islands, n_edges), np.float64),
+                  ((self.n_islands, n_edges), np.bool_),
+                  ((self.n_islands,), np.float64),
+                  ((self.n_islands, max_step + 1), np.int64)]
+        blocks = [shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1))
+                  for shape, dtype in shapes]
+        names = [shm.name for shm in blocks]
+        seeds = [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(self.seed).spawn(self.n_islands)]
+        problem = (self.initial_point, self.final_point, self.n_ants, self.n_iterations, self.size, self.tuning, self.graph)
+
+        barrier = mp.Barrier(self.n_islands)
+        queue = mp.Queue()
+        workers = [mp.Process(target=_island_worker,
+                              args=(index, problem, seeds[index], self.exchange_interval, self.blend,
+                                    names, shapes, barrier, queue))
+                   for index in range(self.n_islands)]
+        try:
+            for worker in workers:
+                worker.start()
+            # Results are read before joining, a full queue would block the workers
+            self.results = sorted(self._collect(queue, workers))
+            for worker in workers:
+                worker.join()
+        finally:
+            for shm in blocks:
+                shm.close()
+                shm.unlink()
+
+        ants = []
+        for index, island_ants, best_path, best_length in self.results:
+            ants.extend(island_ants)
+            if best_length < self.best_length:
+                self.best_length = best_length
+                self.best_path = best_path
+        self.ants = ants
+        return ants
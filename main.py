@@ -19,8 +19,8 @@ ants = aco_pso.run_ACO_PSO()
 best_ant_path_ACOPSO, best_ant_length_ACOPSO = aco_pso.best_path, aco_pso.best_length
 # ------------------------- Pruebas con Vicon --------------------------- #
 # Escogeremos 3 mejores opciones para así probar en 3 robots.
-top_2_ants = sorted(ants, key=lambda ant: ant.cost)[:3]
-ant1, ant2 = top_2_ants[0], top_2_ants[2]
+top_ants = aco_pso.top_ants(3)
+ant1, ant2 = top_ants[0], top_ants[2]
 
 aco_pso.draw_ACOPSO2D(ant1.path, ant1.cost)
 aco_pso.draw_ACOPSO2D(ant2.path, ant2.cost)
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 13:05:22 2026
+
+@author: Rodolfo Alberto Reyes Corona
+"""
+
+import hashlib
+import os
+import numpy as np
+
+STL_TRIANGLE = np.dtype([('normal', '<f4', (3,)), ('vertices', '<f4', (3, 3)), ('attribute', '<u2')])
+
+def read_stl(filename):
+    """
+    Parse a binary or ASCII STL file.
+
+    Returns:
+        points (np.ndarray): (n_points, 3) float32 vertices, the repeated vertices of the triangles are merged.
+        faces (np.ndarray): (n_faces, 3) int32 point ids of every triangle.
+    """
+    with open(filename, 'rb') as file:
+        data = file.read()
+    count = int(np.frombuffer(data, dtype='<u4', count=1, offset=80)[0]) if len(data) >= 84 else -1
+    if len(data) == 84 + count * STL_TRIANGLE.itemsize:
+        vertices = np.frombuffer(data, dtype=STL_TRIANGLE, count=count, offset=84)['vertices'].reshape(-1, 3)
+    else:
+        # ASCII STL: every 'vertex x y z' line is a corner of a triangle
+        lines = [line.split() for line in data.decode('ascii', 'ignore').splitlines()]
+        vertices = np.array([line[1:4] for line in lines if line and line[0] == 'vertex'], dtype=np.float32)
+    points, inverse = np.unique(vertices.reshape(-1, 3), axis=0, return_inverse=True)
+    return points.astype(np.float32), inverse.reshape(-1, 3).astype(np.int32)
+
+def decimate(points, faces, bins):
+    """
+    Vertex clustering: the points inside the same cell of a bins^3 grid become their mean.
+
+    Returns:
+        points (np.ndarray): Points of the simplified mesh.
+        faces (np.ndarray): Faces of the simplified mesh, triangles collapsed into a line or a point are removed.
+    """
+    low = points.min(axis=0)
+    extent = max(float((points.max(axis=0) - low).max()), np.finfo(np.float32).eps)
+    cells = np.minimum(((points - low) / extent * bins).astype(np.int64), bins - 1)
+    cluster_keys = (cells[:, 0] * bins + cells[:, 1]) * bins + cells[:, 2]
+    clusters, cluster = np.unique(cluster_keys, return_inverse=True)
+    cluster = cluster.ravel()
+    counts = np.bincount(cluster, minlength=len(clusters))
+    simplified = np.zeros((len(clusters), 3))
+    np.add.at(simplified, cluster, points)
+    simplified /= counts[:, None]
+
+    faces = cluster[faces]
+    keep = (faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 0] != faces[:, 2])
+    faces = np.unique(np.sort(faces[keep], axis=1), axis=0) if keep.any() else np.empty((0, 3), dtype=np.int64)
+    return simplified.astype(np.float32), faces.astype(np.int32)
+
+def file_hash(filename):
+    digest = hashlib.sha1()
+    with open(filename, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class MeshCache:
+    def __init__(self, directory='.mesh_cache'):
+        """
+        Cache of parsed STL meshes, every file is parsed once and stored as binary .npy buffers.
+
+        The buffers are keyed by the hash of the STL file, the scale and the level of detail,
+        and are opened memory-mapped, so several robots share the same read-only pages.
+
+        Args:
+            directory (str): Folder of the buffers, None keeps the meshes in memory only.
+        Example:
+            cache = MeshCache('stl/.mesh_cache')
+            points, faces = cache.load('stl/parte 1.stl', scale=4, level=2)
+        """
+        self.directory = directory
+        self.meshes = {}
+        self.hashes = {}
+        self.parsed = 0
+
+    def key(self, filename, scale, level):
+        # The hash is only computed again when the file changes
+        stat = os.stat(filename)
+        stamp = (os.path.abspath(filename), stat.st_mtime_ns, stat.st_size)
+        if stamp not in self.hashes:
+            self.hashes[stamp] = file_hash(filename)
+        return f'{self.hashes[stamp]}_{float(scale):g}_{int(level)}'
+
+    def load(self, filename, scale=1.0, level=0):
+        """
+        Points and faces of an STL file.
+
+        Args:
+            filename (str): STL file.
+            scale (float): Factor applied to the points.
+            level (int): Level of detail, 0 is the full mesh and every level halves the clustering grid,
+                    starting at 256 cells along the longest side.
+        Returns:
+            points (np.ndarray): (n_points, 3) read-only float32 points.
+            faces (np.ndarray): (n_faces, 3) read-only int32 point ids.
+        """
+        key = self.key(filename, scale, level)
+        if key in self.meshes:
+            return self.meshes[key]
+        names = None
+        if self.directory is not None:
+            names = [os.path.join(self.directory, f'{key}.{part}.npy') for part in ('points', 'faces')]
+            if all(os.path.exists(name) for name in names):
+                self.meshes[key] = tuple(np.load(name, mmap_mode='r') for name in names)
+                return self.meshes[key]
+
+        points, faces = read_stl(filename)
+        self.parsed += 1
+        if level > 0:
+            points, faces = decimate(points, faces, 256 >> (level - 1))
+        points *= np.float32(scale)
+        if names is None:
+            points.flags.writeable = False
+            faces.flags.writeable = False
+            self.meshes[key] = (points, faces)
+            return self.meshes[key]
+        os.makedirs(self.directory, exist_ok=True)
+        for name, array in zip(names, (points, faces)):
+            # Written to a temporary file first, a concurrent reader never sees a partial buffer
+            temporary = name + f'.{os.getpid()}.tmp'
+            with open(temporary, 'wb') as file:
+                np.save(file, array)
+            os.replace(temporary, name)
+        self.meshes[key] = tuple(np.load(name, mmap_mode='r') for name in names)
+        return self.meshes[key]
+
+def to_polydata(points, faces):
+    """Writable pv.PolyData copy of a cached mesh, e.g. the working copy moved by the simulation."""
+    import pyvista as pv
+
+    cells = np.empty((len(faces), 4), dtype=np.int64)
+    cells[:, 0] = 3
+    cells[:, 1:] = faces
+    return pv.PolyData(np.array(points), cells.ravel())
+
+_default_caches = {}
+
+def default_cache(directory='.mesh_cache'):
+    """Cache shared by every robot of the process that uses the same directory."""
+    if directory not in _default_caches:
+        _default_caches[directory] = MeshCache(directory)
+    return _default_caches[directory]
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 21:48:05 2026
+
+@author: Rodolfo Alberto Reyes Corona
+"""
+
+import numpy as np
+from shortest_path import astar
+
+def remove_loops(nodes):
+    """Remove the cycles of a path of node ids, every node is visited at most once."""
+    last = {node: k for k, node in enumerate(nodes.tolist())}
+    kept, k = [], 0
+    while k < len(nodes):
+        kept.append(k)
+        k = last[int(nodes[k])] + 1
+    return nodes[kept]
+
+def path_length(points):
+    """Length of a polyline."""
+    points = np.asarray(points, dtype=float)
+    return float(np.sqrt((np.diff(points, axis=0) ** 2).sum(axis=1)).sum())
+
+def shortcut(graph, nodes):
+    """
+    Replace runs of waypoints by straight segments while the segment only crosses free cells.
+
+    Args:
+        graph (GridGraph): Grid graph of the path.
+        nodes (np.ndarray): Node ids of a path.
+    Returns:
+        waypoints (np.ndarray): Node ids of the kept waypoints, the first and last nodes are always kept.
+    """
+    waypoints = [0]
+    while waypoints[-1] < len(nodes) - 1:
+        current = waypoints[-1]
+        reach = current + 1
+        # Greedy: extend the segment until the next node is no longer visible
+        while reach + 1 < len(nodes) and graph.line_of_sight(nodes[current], nodes[reach + 1]):
+            reach += 1
+        waypoints.append(reach)
+    return nodes[waypoints]
+
+def smooth_path(graph, nodes):
+    """Loop-free and shortcut version of a path of node ids, as waypoint node ids and their length."""
+    waypoints = shortcut(graph, remove_loops(nodes))
+    return waypoints, path_length(graph.coordinates[waypoints])
+
+def repair_path(graph, nodes, start, goal):
+    """
+    Reconnect a path after the graph or its endpoints changed.
+
+    The path is cut at its closest nodes to the new start and goal, the removed nodes are dropped
+    and every gap is bridged with A*.
+
+    Args:
+        graph (GridGraph): New grid graph.
+        nodes (np.ndarray): Node ids of the old path in the new graph, -1 for the removed nodes.
+        start (int): Node id of the new start.
+        goal (int): Node id of the new goal.
+    Returns:
+        nodes (np.ndarray): Loop-free path from start to goal, None if the goal is unreachable.
+    """
+    nodes = nodes[nodes >= 0]
+    if len(nodes):
+        points = graph.coordinates[nodes]
+        first = int(np.argmin(((points - graph.coordinates[start]) ** 2).sum(axis=1)))
+        last = int(np.argmin(((points - graph.coordinates[goal]) ** 2).sum(axis=1)))
+        nodes = nodes[first:last + 1]
+    repaired = [start]
+    for node in nodes.tolist() + [goal]:
+        if node == repaired[-1]:
+            continue
+        if graph.edge_index(repaired[-1], node) < 0:
+            bridge, length = astar(graph, repaired[-1], node)
+            if bridge is None:
+                # A node of the old path that is now isolated is skipped
+                if node == goal:
+                    return None
+                continue
+            repaired.extend(bridge[1:-1].tolist())
+        repaired.append(node)
+    return remove_loops(np.array(repaired, dtype=np.int64))
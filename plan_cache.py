@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 15:02:36 2026
+
+@author: Rodolfo Alberto Reyes Corona
+"""
+
+from collections import OrderedDict
+import json
+import os
+import threading
+import numpy as np
+
+class PlanCache:
+    def __init__(self, capacity=32, filename=None, near_distance=np.inf):
+        """
+        LRU cache of solved plans, shared by several ACO_PSO planners.
+
+        Args:
+            capacity (int): Maximum number of stored plans, the least recently used one is evicted.
+            filename (str): .npz file used to persist the cache, loaded now if it exists. None keeps it in memory.
+            near_distance (float): Maximum distance between the endpoints of a near hit and the requested ones.
+        Example:
+            cache = PlanCache(64, 'plans.npz')
+            hybrid_algorithm = ACO_PSO([0,0], [5,5], 100, 10, [5,5], cache=cache)
+            hybrid_algorithm.run_ACO_PSO()
+            cache.save()
+        """
+        self.capacity = capacity
+        self.filename = filename
+        self.near_distance = near_distance
+        self.entries = OrderedDict()
+        # Planners of several threads may share the cache, e.g. the planning service
+        self.lock = threading.RLock()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        if filename is not None and os.path.exists(filename):
+            self.load(filename)
+
+    def key(self, planner):
+        # Geometry, endpoints and parameters of the planner, as a JSON string
+        geometry = planner.graph.geometry_key()
+        endpoints = [[float(value) for value in planner.initial_point], [float(value) for value in planner.final_point]]
+        parameters = [planner.n_ants, planner.n_iterations, planner.max_step, planner.tuning,
+                      None if planner.seed is None else int(planner.seed),
+                      planner.seed_shortest_path, float(planner.heuristic_weight),
+                      None if planner.gap_tolerance is None else float(planner.gap_tolerance),
+                      bool(planner.tabu), bool(planner.smooth_paths)]
+        return json.dumps([geometry, endpoints, parameters])
+
+    def lookup(self, planner):
+        """
+        Search the plan of a planner.
+
+        Returns:
+            entry (dict): Stored plan, None on a miss.
+            exact (bool): True if the geometry, endpoints and parameters are the same and the stored run was
+                    complete, a run cut short is only a near hit.
+        """
+        with self.lock:
+            key = self.key(planner)
+            if key in self.entries and self.entries[key]['complete']:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key], True
+
+            # Closest plan over the same grid, the edge ids of its pheromones are still valid
+            geometry, endpoints, parameters = json.loads(key)
+            closest, closest_distance = None, self.near_distance
+            for stored_key in self.entries:
+                stored_geometry, stored_endpoints, stored_parameters = json.loads(stored_key)
+                if stored_geometry != geometry:
+                    continue
+                distance = np.linalg.norm(np.subtract(stored_endpoints, endpoints), axis=1).sum()
+                if distance <= closest_distance:
+                    closest, closest_distance = stored_key, distance
+            if closest is None:
+                self.misses += 1
+                return None, False
+            self.entries.move_to_end(closest)
+            self.near_hits += 1
+            return self.entries[closest], False
+
+    def store(self, planner, complete=True):
+        """
+        Store the plan of a planner whose best path reaches the goal.
+
+        Args:
+            planner (ACO_PSO): Solved planner.
+            complete (bool): False for a run cut short (time budget, patience), it is only used
+                    to warm-start other plans and never returned as an exact hit.
+        """
+        with self.lock:
+            goal = planner.graph.node_index(planner.final_point)
+            if planner.best_nodes is None or goal < 0 or planner.best_nodes[-1] != goal:
+                return
+            key = self.key(planner)
+            if not complete and key in self.entries and self.entries[key]['complete']:
+                return
+            # The top paths are kept flat, one array of nodes and the number of nodes of every path
+            top = sorted(planner.top_heap, key=lambda entry: -entry[0])
+            self.entries[key] = {'best_nodes': planner.best_nodes.copy(),
+                                 'best_length': float(planner.best_length),
+                                 'top_nodes': np.concatenate([nodes for cost, _, nodes in top]),
+                                 'top_counts': np.array([len(nodes) for cost, _, nodes in top], dtype=np.int64),
+                                 'top_costs': np.array([-cost for cost, _, nodes in top], dtype=float),
+                                 'pheromones': planner.pheromones.copy(),
+                                 'visited_routes': planner.visited_routes.copy(),
+                                 'alpha': float(planner.alpha),
+                                 'beta': float(planner.beta),
+                                 'complete': bool(complete)}
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+
+    def save(self, filename=None):
+        with self.lock:
+            filename = filename if filename is not None else self.filename
+            arrays = {'keys': np.array(list(self.entries), dtype=str)}
+            for i, entry in enumerate(self.entries.values()):
+                for name, value in entry.items():
+                    arrays[f'{i}_{name}'] = np.asarray(value)
+            np.savez_compressed(filename, **arrays)
+
+    def load(self, filename):
+        with np.load(filename) as data:
+            for i, key in enumerate(data['keys']):
+                entry = {name: data[f'{i}_{name}'] for name in ('best_nodes', 'pheromones', 'visited_routes',
+                                                                'top_nodes', 'top_counts', 'top_costs')
+                         if f'{i}_{name}' in data.files}
+                for name in ('best_length', 'alpha', 'beta'):
+                    entry[name] = float(data[f'{i}_{name}'])
+                entry['complete'] = bool(data[f'{i}_complete']) if f'{i}_complete' in data.files else True
+                self.entries[str(key)] = entry
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 17:24:15 2026
+
+@author: Rodolfo Alberto Reyes Corona
+"""
+
+from collections import defaultdict
+from contextlib import contextmanager
+import json
+import math
+import numbers
+import time
+
+def prometheus_value(value):
+    """Sample value in the Prometheus text format, which spells the special floats +Inf, -Inf and NaN."""
+    if isinstance(value, numbers.Integral):
+        return str(int(value))
+    value = float(value)
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(value)
+
+class PhaseProfiler:
+    def __init__(self):
+        """
+        Opt-in per-phase timers, counters and gauges of a planner.
+
+        A planner built with profiler=None skips every measurement, so the instrumentation
+        only costs a comparison against None when it is disabled.
+
+        Example:
+            profiler = PhaseProfiler()
+            profiler.subscribe(lambda metrics: print(metrics['iteration'], metrics['timers']))
+            hybrid_algorithm = ACO_PSO([0,0], [5,5], 100, 10, [5,5], profiler=profiler)
+            hybrid_algorithm.run_ACO_PSO()
+            print(profiler.to_prometheus())
+        """
+        self.timers = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.counters = defaultdict(int)
+        self.gauges = {}
+        self.observers = []
+        self.iteration = -1
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name, seconds, calls=1):
+        self.timers[name] += seconds
+        self.calls[name] += calls
+
+    def count(self, name, value=1):
+        self.counters[name] += value
+
+    def gauge(self, name, value):
+        self.gauges[name] = value
+
+    def subscribe(self, observer):
+        """observer(metrics) is called with to_dict() at the end of every iteration."""
+        self.observers.append(observer)
+
+    def end_iteration(self, iteration):
+        self.iteration = iteration
+        if self.observers:
+            metrics = self.to_dict()
+            for observer in self.observers:
+                observer(metrics)
+
+    def reset(self):
+        self.timers.clear()
+        self.calls.clear()
+        self.counters.clear()
+        self.gauges.clear()
+        self.iteration = -1
+
+    def to_dict(self):
+        return {'iteration': self.iteration,
+                'timers': dict(self.timers),
+                'calls': dict(self.calls),
+                'counters': dict(self.counters),
+                'gauges': dict(self.gauges)}
+
+    def to_json(self, filename=None):
+        text = json.dumps(self.to_dict(), indent=2)
+        if filename is not None:
+            with open(filename, 'w') as file:
+                file.write(text)
+        return text
+
+    def to_prometheus(self, prefix='aco_pso'):
+        """Metrics in the Prometheus text exposition format."""
+        lines = [f'# TYPE {prefix}_phase_seconds_total counter']
+        lines += [f'{prefix}_phase_seconds_total{{phase="{name}"}} {prometheus_value(value)}' for name, value in sorted(self.timers.items())]
+        lines.append(f'# TYPE {prefix}_phase_calls_total counter')
+        lines += [f'{prefix}_phase_calls_total{{phase="{name}"}} {prometheus_value(value)}' for name, value in sorted(self.calls.items())]
+        for name, value in sorted(self.counters.items()):
+            lines.append(f'# TYPE {prefix}_{name}_total counter')
+            lines.append(f'{prefix}_{name}_total {prometheus_value(value)}')
+        for name, value in sorted(self.gauges.items()):
+            lines.append(f'# TYPE {prefix}_{name} gauge')
+            lines.append(f'{prefix}_{name} {prometheus_value(value)}')
+        return '\n'.join(lines) + '\n'
@@ -8,19 +8,20 @@ Created on Sat Jan 18 12:46:18 2025
 import numpy as np
 
 class Particle:
-    def __init__(self, var_min, var_max, variables, initial_cost, current_cost):
+    def __init__(self, var_min, var_max, variables, initial_cost, current_cost, rng=None):
         self.var_min = var_min
         self.var_max = var_max
         self.variables = variables
+        self.rng = rng if rng is not None else np.random.default_rng()
 
-        self.position = np.random.uniform(var_min, var_max, variables)
-        self.velocity = np.random.uniform(-1, 1, variables)
+        self.position = self.rng.uniform(var_min, var_max, variables)
+        self.velocity = self.rng.uniform(-1, 1, variables)
         self.best_position = self.position.copy()
         self.best_cost = initial_cost     # Inicializar el mejor costo con el valor proporcionado
         self.current_cost = initial_cost  # Inicializar el costo actual con el valor proporcionado
 
     def update(self, global_best_position, w, c1, c2):
-        self.velocity = w * self.velocity + c1 * np.random.rand(self.variables) * (self.best_position - self.position) + c2 * np.random.rand(self.variables) * (global_best_position - self.position)
+        self.velocity = w * self.velocity + c1 * self.rng.random(self.variables) * (self.best_position - self.position) + c2 * self.rng.random(self.variables) * (global_best_position - self.position)
         self.position += self.velocity
         self.position = np.minimum(np.maximum(self.position, self.var_min), self.var_max)
 
@@ -29,8 +30,11 @@ class Particle:
             self.best_position = self.position.copy()
 
 class ParticleSwarmOptimizer:
-    def __init__(self, num_particles, num_iterations, var_min, var_max, variables, initial_cost, current_cost):
-        self.particles = [Particle(var_min, var_max, variables, initial_cost, current_cost) for _ in range(num_particles)]
+    def __init__(self, num_particles, num_iterations, var_min, var_max, variables, initial_cost, current_cost, rng=None,
+                 fitness=None):
+        # fitness maps the (num_particles, variables) positions to their costs, like in SwarmOptimizer
+        self.fitness = fitness
+        self.particles = [Particle(var_min, var_max, variables, initial_cost, current_cost, rng) for _ in range(num_particles)]
         self.global_best = min(self.particles, key=lambda x: x.best_cost)
         self.num_iterations = num_iterations
         self.w  = 1.0
@@ -45,6 +49,13 @@ class ParticleSwarmOptimizer:
             for particle in self.particles:
                 particle.update(self.global_best.best_position, self.w, self.c1, self.c2)
                 iteration_positions.append(particle.position.copy())  # Guardar la posición actual de la partícula
+            if self.fitness is not None:
+                costs = self.fitness(np.array(iteration_positions))
+                for particle, cost in zip(self.particles, costs):
+                    particle.current_cost = cost
+                    if cost < particle.best_cost:
+                        particle.best_cost = cost
+                        particle.best_position = particle.position.copy()
 
             self.particle_positions.append(iteration_positions)  # Agregar la lista de posiciones en la iteración actual
             self.global_best = min(self.particles, key=lambda x: x.best_cost)
@@ -56,3 +67,93 @@ class ParticleSwarmOptimizer:
         return self.global_best.best_position
 
 
+class SwarmOptimizer:
+    def __init__(self, num_particles, num_iterations, var_min, var_max, variables, initial_cost, current_cost,
+                 rng=None, fitness=None, record_positions=False, patience=10, tolerance=1e-6):
+        """
+        Vectorized swarm, every particle is a row of the (num_particles, variables) arrays.
+
+        Args:
+            num_particles (int): Number of particles of the swarm.
+            num_iterations (int): Maximum number of iterations.
+            var_min (float): Lower bound of every variable.
+            var_max (float): Upper bound of every variable.
+            variables (int): Number of variables of a particle.
+            initial_cost (float): Initial best cost of every particle.
+            current_cost (float): Cost of every particle when there is no fitness function. Like in
+                    ParticleSwarmOptimizer it never replaces the best costs, the initial bests are kept.
+            rng (np.random.Generator): Random generator, None for a random seed.
+            fitness (callable): Maps the (num_particles, variables) positions to their costs, optional.
+            record_positions (bool): Store the positions of every iteration in particle_positions.
+            patience (int): Iterations without improvement of the global best before stopping.
+            tolerance (float): Minimum improvement of the global best, also the spread of a collapsed swarm.
+        Example:
+            optimizer = SwarmOptimizer(300, 100, 0, 1, 2, 10.0, 9.5)
+            optimizer.optimize()
+            beta, alpha = optimizer.get_best_position()
+        """
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.num_iterations = num_iterations
+        self.var_min = var_min
+        self.var_max = var_max
+        self.current_cost = current_cost
+        self.fitness = fitness
+        self.record_positions = record_positions
+        self.patience = patience
+        self.tolerance = tolerance
+        self.w  = 1.0
+        self.c1 = 2.0
+        self.c2 = 2.0
+
+        self.position = self.rng.uniform(var_min, var_max, (num_particles, variables))
+        self.velocity = self.rng.uniform(-1, 1, (num_particles, variables))
+        self.best_position = self.position.copy()
+        self.best_cost = np.full(num_particles, initial_cost, dtype=float)
+        self.global_best = int(np.argmin(self.best_cost))
+        self.particle_positions = []
+        self.iterations_run = 0
+
+    def evaluate(self):
+        # Without a fitness function there is nothing to compare, a constant cost is never an improvement
+        if self.fitness is None:
+            return None
+        return np.asarray(self.fitness(self.position), dtype=float)
+
+    def optimize(self):
+        global_best_cost = self.best_cost[self.global_best]
+        stall = 0
+        for iteration in range(self.num_iterations):
+            global_best_position = self.best_position[self.global_best]
+            r1 = self.rng.random(self.position.shape)
+            r2 = self.rng.random(self.position.shape)
+            self.velocity *= self.w
+            self.velocity += self.c1 * r1 * (self.best_position - self.position)
+            self.velocity += self.c2 * r2 * (global_best_position - self.position)
+            self.position += self.velocity
+            np.clip(self.position, self.var_min, self.var_max, out=self.position)
+
+            cost = self.evaluate()
+            if cost is not None:
+                improved = cost < self.best_cost
+                self.best_cost[improved] = cost[improved]
+                self.best_position[improved] = self.position[improved]
+            if self.record_positions:
+                self.particle_positions.append(self.position.copy())
+            self.global_best = int(np.argmin(self.best_cost))
+            self.iterations_run += 1
+
+            # Early exit when the global best stops improving or the swarm collapses
+            if self.best_cost[self.global_best] < global_best_cost - self.tolerance:
+                global_best_cost = self.best_cost[self.global_best]
+                stall = 0
+            else:
+                stall += 1
+            spread = np.ptp(self.position, axis=0).max()
+            if stall >= self.patience or spread < self.tolerance:
+                break
+
+    def get_particle_positions(self):
+        return self.particle_positions
+
+    def get_best_position(self):
+        return self.best_position[self.global_best].copy()
@@ -5,9 +5,60 @@ Created on Mon Nov 25 17:42:37 2024
 @author: rodo1
 """
 
-import OmniRobot as pO
 import numpy as np 
 
+def _segments(route, resolution):
+    # Start, direction and number of samples of every segment, and the index of its first sample
+    route = np.asarray(route, dtype=float)[:, :2]
+    starts = route[:-1]
+    deltas = np.diff(route, axis=0)
+    lengths = np.sqrt((deltas ** 2).sum(axis=1))
+    # Every segment keeps at least its first point, repeated waypoints are skipped
+    counts = np.where(lengths > 0, np.maximum(np.ceil(lengths / resolution - 1e-9), 1), 0).astype(np.int64)
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+    return route, starts, deltas, counts, offsets
+
+def _samples(route, starts, deltas, counts, offsets, first, last):
+    # Samples first..last-1 of the densified route, the final waypoint is the sample offsets[-1]
+    index = np.arange(first, last)
+    segment = np.minimum(np.searchsorted(offsets, index, side='right') - 1, len(starts) - 1)
+    samples = np.empty((len(index), 2))
+    inner = index < offsets[-1]
+    segment, index_inner = segment[inner], index[inner]
+    t = (index_inner - offsets[segment]) / counts[segment]
+    samples[inner] = starts[segment] + t[:, None] * deltas[segment]
+    samples[~inner] = route[-1]
+    return samples
+
+def densify(route, resolution=0.01):
+    """
+    Points of a route every resolution meters, in a single vectorized pass.
+
+    Args:
+        route (list): Waypoints (x, y) of the route, including the initial point.
+        resolution (float): Maximum distance between two consecutive points.
+    Returns:
+        trajectory (np.ndarray): Contiguous (N, 2) array, from the first to the last waypoint.
+    Example:
+        trajectory = densify([[0, 0], [0.5, 0], [0.5, 1]], 0.01)
+    """
+    route, starts, deltas, counts, offsets = _segments(route, resolution)
+    return _samples(route, starts, deltas, counts, offsets, 0, offsets[-1] + 1)
+
+def densify_chunks(route, resolution=0.01, chunk_size=4096):
+    """
+    Same points as densify, yielded as (chunk_size, 2) arrays so the whole trajectory is never in memory.
+
+    Example:
+        for setpoints in densify_chunks(route, 0.01, 256):
+            controller.send(setpoints)
+    """
+    route, starts, deltas, counts, offsets = _segments(route, resolution)
+    total = offsets[-1] + 1
+    for first in range(0, total, chunk_size):
+        yield _samples(route, starts, deltas, counts, offsets, first, min(first + chunk_size, total))
+
+
 class robot_ant:
     def __init__(self, ts, point1, point2, size):
         """
@@ -21,10 +72,32 @@ class robot_ant:
         self.point1 = point1
         self.point2 = point2
         self.size = size
+
+    def reference(self, route, resolution=0.01, speed=None):
+        """
+        Reference trajectory from point1 through every point of route.
+
+        Args:
+            route (list): Waypoints (x, y) after point1.
+            resolution (float): Distance between two references (m).
+            speed (float): Speed of the robot (m/s), if given the references are one sampling time apart,
+                    resolution = speed * ts.
+        Returns:
+            trajectory (np.ndarray): (N, 2) references, point1 is not modified.
+        """
+        resolution = speed * self.ts if speed is not None else resolution
+        return densify(np.vstack(([self.point1[:2]], np.asarray(route, dtype=float)[:, :2])), resolution)
+
+    def stream_reference(self, route, resolution=0.01, speed=None, chunk_size=4096):
+        """Generator version of reference, yields at most chunk_size references at a time."""
+        resolution = speed * self.ts if speed is not None else resolution
+        return densify_chunks(np.vstack(([self.point1[:2]], np.asarray(route, dtype=float)[:, :2])), resolution,
+                              chunk_size)
     
     def draw_path(self, route):
-        hx, hy, phi = [], [], 0
-        # Generate points along the line from point0 to each point in points
+        import OmniRobot as pO
+
+        phi = 0
         path = "stl"
         color = ["white", "blue"]
         omni3 = pO.Omnirobot(path,color)
@@ -35,14 +108,9 @@ class robot_ant:
         escala = 4
         omni3.configureScene(bounds)
         
-        for point in route:
-            dist = np.linalg.norm(np.array(point) - np.array(self.point1))
-            steps = int(dist / 0.01)  # Adjust 0.01 for step size
-            hx_aux = np.linspace(self.point1[0], point[0], steps)
-            hy_aux = np.linspace(self.point1[1], point[1], steps)
-            hx.extend(hx_aux)
-            hy.extend(hy_aux)  
-            self.point1 = point
+        # Generate points along the route every 0.01 m (adjust it for the step size)
+        trajectory = self.reference(route, 0.01)
+        hx, hy = trajectory[:, 0], trajectory[:, 1]
 
         omni3.initTrajectory(hx,hy)
         omni3.initRobot(hx,hy,phi,escala)
@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 13:22:47 2026
+
+@author: Rodolfo Alberto Reyes Corona
+
+Headless planning service: a CLI and an asyncio server answering JSON plan requests.
+Only the NumPy planning core is imported at startup, matplotlib is loaded only by a request that renders.
+
+Example:
+    python service.py plan '{"initial_point": [0, 0], "final_point": [5, 5], "size": [5, 5]}'
+    python service.py serve --port 8765
+    curl -d '{"initial_point": [0, 0], "final_point": [5, 5], "size": [5, 5]}' http://127.0.0.1:8765/plan
+    echo '{"initial_point": [0, 0], "final_point": [5, 5], "size": [5, 5]}' | nc 127.0.0.1 8765
+"""
+
+import argparse
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import sys
+import threading
+import time
+import numpy as np
+from aco_pso import ACO_PSO
+from grid_graph import GridGraph
+from plan_cache import PlanCache
+
+# Errors of a bad request, answered with a JSON error instead of a traceback
+REQUEST_ERRORS = (ValueError, KeyError, TypeError, OSError)
+
+# Keyword arguments of ACO_PSO a request may set
+PLANNER_OPTIONS = ('seed', 'tuning', 'top_k', 'seed_shortest_path', 'heuristic_weight', 'gap_tolerance', 'tabu',
+                   'smooth_paths')
+
+class PlanningService:
+    def __init__(self, max_graphs=16, cache_capacity=256, cache_file=None):
+        """
+        Planner state kept warm between requests: the grid graphs and a PlanCache of solved plans.
+
+        Args:
+            max_graphs (int): Number of grid graphs kept in memory, the least recently used one is dropped.
+            cache_capacity (int): Capacity of the plan cache.
+            cache_file (str): .npz file of the plan cache, loaded now and written by save.
+        Example:
+            service = PlanningService()
+            service.plan({'initial_point': [0, 0], 'final_point': [5, 5], 'size': [5, 5]})
+        """
+        self.max_graphs = max_graphs
+        self.graphs = OrderedDict()
+        self.lock = threading.Lock()
+        self.cache = PlanCache(cache_capacity, cache_file)
+        self.requests = 0
+        self.errors = 0
+
+    def graph(self, request):
+        """Grid graph of a request, built once per geometry."""
+        if 'map' in request:
+            spec = {'map': request['map'], 'resolution': request.get('resolution', 0.5),
+                    'map_resolution': request.get('map_resolution'), 'radius': request.get('radius'),
+                    'threshold': request.get('threshold', 0.5), 'origin': request.get('origin', [0, 0])}
+        elif 'size' in request:
+            spec = {'size': request['size'], 'resolution': request.get('resolution', 0.5),
+                    'radius': request.get('radius', 0.8)}
+        else:
+            raise ValueError('A plan request needs the size of the area or an occupancy map')
+        key = json.dumps(spec, sort_keys=True)
+        with self.lock:
+            if key in self.graphs:
+                self.graphs.move_to_end(key)
+                return self.graphs[key]
+        if 'map' in spec:
+            graph = GridGraph.from_file(spec['map'], spec['resolution'], spec['map_resolution'], spec['radius'],
+                                        spec['threshold'], spec['origin'])
+        else:
+            graph = GridGraph(spec['size'], spec['resolution'], spec['radius'])
+        with self.lock:
+            self.graphs[key] = graph
+            while len(self.graphs) > self.max_graphs:
+                self.graphs.popitem(last=False)
+        return graph
+
+    def plan(self, request):
+        """
+        Solve a JSON plan request.
+
+        Args:
+            request (dict): initial_point, final_point and the area ('size', or 'map' with 'resolution' and
+                    'map_resolution'). Optional: n_ants, n_iterations, time_budget, patience, the ACO_PSO
+                    options of PLANNER_OPTIONS, and render, a .gif/.png/.mp4 file of the path animation.
+        Returns:
+            response (dict): path, length, iterations, cached, elapsed, and waypoints when smooth_paths is set.
+        """
+        start = time.perf_counter()
+        self.count('requests')
+        validate_request(request)
+        graph = self.graph(request)
+        options = {name: request[name] for name in PLANNER_OPTIONS if name in request}
+        # Rollout tuning runs inline, the service already answers several requests at once
+        planner = ACO_PSO(request['initial_point'], request['final_point'], request.get('n_ants', 50),
+                          request.get('n_iterations', 20), None, graph=graph, cache=self.cache, n_workers=0,
+                          **options)
+        iterations, cached = 0, False
+        for snapshot in planner.iterate_ACO_PSO(request.get('time_budget'), request.get('patience')):
+            iterations += 1
+            cached = snapshot.iteration < 0
+        if planner.best_nodes is None or planner.best_nodes[-1] != graph.node_index(planner.final_point):
+            raise ValueError(f'No path found from {planner.initial_point} to {planner.final_point}')
+
+        response = {'path': np.asarray(planner.best_path, dtype=float).tolist(),
+                    'length': float(planner.best_length),
+                    'iterations': 0 if cached else iterations,
+                    'cached': cached}
+        if planner.best_waypoints is not None:
+            response['waypoints'] = planner.best_waypoints
+            response['waypoints_length'] = float(planner.best_waypoints_length)
+        if request.get('render'):
+            response['render'] = self.render(planner, request['render'])
+        response['elapsed'] = time.perf_counter() - start
+        return response
+
+    def render(self, planner, filename):
+        # The visualization modules are only imported by the requests that use them
+        from animation import AnimationACO
+
+        ants = planner.top_ants()
+        animation = AnimationACO(planner.size, [ant.path for ant in ants], [ant.cost for ant in ants],
+                                 planner.n_ants, planner.n_iterations, [20 * k for k in range(len(ants))],
+                                 headless=True)
+        animation.save(filename, step=5)
+        return filename
+
+    def count(self, name):
+        # The plans run on the threads of the server pool
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def stats(self):
+        return {'requests': self.requests, 'errors': self.errors, 'graphs': len(self.graphs),
+                'plans': len(self.cache.entries), 'cache_hits': self.cache.hits,
+                'cache_near_hits': self.cache.near_hits, 'cache_misses': self.cache.misses}
+
+    def save(self):
+        if self.cache.filename is not None:
+            self.cache.save()
+
+class PlanningServer:
+    def __init__(self, service, max_workers=None):
+        """
+        asyncio server of a PlanningService. Every connection can speak HTTP (POST /plan, GET /stats,
+        GET /health) or newline-delimited JSON, one request and one response per line.
+        The plans run in a thread pool, so slow requests do not block the others.
+
+        Args:
+            service (PlanningService): Planner state shared by every request.
+            max_workers (int): Plans solved at the same time, None for the number of cores.
+        """
+        self.service = service
+        self.executor = ThreadPoolExecutor(max_workers if max_workers is not None else os.cpu_count())
+
+    async def answer(self, data):
+        try:
+            request = json.loads(data)
+            if not isinstance(request, dict):
+                raise ValueError('A plan request must be a JSON object')
+            loop = asyncio.get_running_loop()
+            return 200, await loop.run_in_executor(self.executor, self.service.plan, request)
+        except REQUEST_ERRORS as error:
+            self.service.count('errors')
+            return 400, {'error': error_message(error)}
+        except Exception as error:
+            # A failure of the planner itself, the connection keeps answering the next requests
+            self.service.count('errors')
+            return 500, {'error': f'{type(error).__name__}: {error}'}
+
+    async def handle(self, reader, writer):
+        try:
+            first = await reader.readline()
+            if first.lstrip().startswith(b'{'):
+                line = first
+                while line:
+                    if line.strip():
+                        status, response = await self.answer(line)
+                        writer.write(json.dumps(response).encode() + b'\n')
+                        await writer.drain()
+                    line = await reader.readline()
+            elif first:
+                await self.handle_http(first, reader, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle_http(self, first, reader, writer):
+        headers = {}
+        try:
+            parts = first.decode('latin-1').split()
+            if len(parts) < 2:
+                raise ValueError(f'Malformed request line {first.strip()!r}')
+            method, target = parts[:2]
+            while True:
+                line = await reader.readline()
+                if not line.strip():
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get('content-length', 0)) if method == 'POST' else 0
+            if length < 0:
+                raise ValueError(f'Invalid Content-Length {length}')
+        except ValueError as error:
+            self.service.count('errors')
+            method = target = None
+            status, response = 400, {'error': str(error)}
+
+        if method is None:
+            pass  # Malformed request line or headers, answered with the 400 above
+        elif method == 'GET' and target == '/health':
+            status, response = 200, {'status': 'ok'}
+        elif method == 'GET' and target == '/stats':
+            status, response = 200, self.service.stats()
+        elif method == 'POST' and target == '/plan':
+            body = await reader.readexactly(length)
+            status, response = await self.answer(body)
+        else:
+            status, response = 404, {'error': f'Unknown endpoint {method} {target}'}
+        body = json.dumps(response).encode()
+        reason = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 500: 'Internal Server Error'}[status]
+        writer.write(f'HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n'
+                     f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode() + body)
+        await writer.drain()
+
+    async def serve(self, host='127.0.0.1', port=8765, unix=None):
+        if unix is not None:
+            server = await asyncio.start_unix_server(self.handle, unix)
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            print(f'Planning service listening on {unix if unix is not None else f"{host}:{port}"}', flush=True)
+            await server.serve_forever()
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and np.isfinite(value)
+
+def validate_request(request):
+    """Reject a malformed plan request with a ValueError before any graph or planner is built."""
+    for name in ('initial_point', 'final_point'):
+        point = request[name]
+        if not isinstance(point, list) or len(point) != 2 or not all(is_number(value) for value in point):
+            raise ValueError(f'{name} must be a list of 2 numbers, got {point!r}')
+    if 'size' in request and 'map' not in request:
+        size = request['size']
+        if not isinstance(size, list) or len(size) != 2 or not all(is_number(value) and value > 0 for value in size):
+            raise ValueError(f'size must be a list of 2 positive numbers, got {size!r}')
+    for name in ('n_ants', 'n_iterations', 'top_k', 'patience'):
+        value = request.get(name)
+        if value is not None and (not isinstance(value, int) or isinstance(value, bool) or value <= 0):
+            raise ValueError(f'{name} must be a positive integer, got {value!r}')
+    for name in ('resolution', 'map_resolution', 'radius', 'time_budget'):
+        value = request.get(name)
+        if value is not None and (not is_number(value) or value <= 0):
+            raise ValueError(f'{name} must be a positive number, got {value!r}')
+    if request.get('tuning', 'static') not in ('static', 'rollout'):
+        raise ValueError(f"tuning must be 'static' or 'rollout', got {request['tuning']!r}")
+
+def error_message(error):
+    return f'Missing field {error}' if isinstance(error, KeyError) else str(error)
+
+def read_request(text):
+    return json.load(sys.stdin) if text == '-' else json.loads(text)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Headless ACO/PSO planning service.')
+    parser.add_argument('--cache-file', help='.npz file of the plan cache, kept between runs')
+    commands = parser.add_subparsers(dest='command', required=True)
+    plan = commands.add_parser('plan', help='Solve one JSON plan request and print the JSON response')
+    plan.add_argument('request', help='JSON request, - to read it from stdin')
+    serve = commands.add_parser('serve', help='Answer HTTP and JSON-lines plan requests')
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8765)
+    serve.add_argument('--unix', help='Unix socket path, used instead of host and port')
+    serve.add_argument('--workers', type=int, help='Plans solved at the same time, default every core')
+    args = parser.parse_args(argv)
+
+    service = PlanningService(cache_file=args.cache_file)
+    if args.command == 'plan':
+        try:
+            print(json.dumps(service.plan(read_request(args.request))))
+        except REQUEST_ERRORS as error:
+            print(json.dumps({'error': error_message(error)}))
+            return 1
+        except Exception as error:
+            print(json.dumps({'error': f'{type(error).__name__}: {error}'}))
+            return 1
+        finally:
+            service.save()
+        return 0
+    try:
+        asyncio.run(PlanningServer(service, args.workers).serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.save()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 20:37:14 2026
+
+@author: Rodolfo Alberto Reyes Corona
+"""
+
+import heapq
+import numpy as np
+
+def dijkstra(graph, source):
+    """
+    Exact distance of every node to source over the edges of a GridGraph.
+
+    The grid graph is symmetric, so the result is also the cost-to-go of every node when source is the goal.
+    SciPy is used when it is installed, otherwise a binary heap over the CSR adjacency.
+
+    Returns:
+        distance (np.ndarray): Distance of every node, np.inf for unreachable nodes.
+        predecessor (np.ndarray): Next node towards source, -1 for source and unreachable nodes.
+    """
+    try:
+        from scipy.sparse import csr_matrix
+        from scipy.sparse.csgraph import dijkstra as csgraph_dijkstra
+    except ImportError:
+        csgraph_dijkstra = None
+    if csgraph_dijkstra is not None:
+        matrix = csr_matrix((graph.edge_lengths, graph.indices, graph.indptr), shape=(graph.n_nodes, graph.n_nodes))
+        distance, predecessor = csgraph_dijkstra(matrix, indices=source, return_predecessors=True)
+        return distance, np.where(predecessor < 0, -1, predecessor)
+
+    distance = np.full(graph.n_nodes, np.inf)
+    predecessor = np.full(graph.n_nodes, -1, dtype=np.int64)
+    distance[source] = 0
+    heap = [(0.0, source)]
+    while heap:
+        d, node = heapq.heappop(heap)
+        if d > distance[node]:
+            continue
+        start, end = graph.indptr[node], graph.indptr[node + 1]
+        for target, length in zip(graph.indices[start:end].tolist(), graph.edge_lengths[start:end].tolist()):
+            candidate = d + length
+            if candidate < distance[target]:
+                distance[target] = candidate
+                predecessor[target] = node
+                heapq.heappush(heap, (candidate, target))
+    return distance, predecessor
+
+def repair_dijkstra(graph, distance, predecessor, source, touched, max_fraction=0.25):
+    """
+    Update a dijkstra result after the edges of some nodes changed, see GridGraph.updated.
+
+    Every other edge is unchanged, so only the nodes whose tree path crosses a touched node lose their
+    distance. They are searched again from the valid nodes around them, and the distances that drop
+    through the new edges spread outwards. A new full search is run when too many nodes are lost.
+
+    Args:
+        graph (GridGraph): Updated graph.
+        distance (np.ndarray): Distances of the old result, moved to the node ids of graph (np.inf for new nodes).
+        predecessor (np.ndarray): Predecessors of the old result, moved to the node ids of graph.
+        source (int): Source of the search, node id of graph.
+        touched (np.ndarray): Nodes of graph whose edges changed.
+        max_fraction (float): Fraction of lost nodes above which a new full search is faster.
+    Returns:
+        distance (np.ndarray): Distance of every node, np.inf for unreachable nodes.
+        predecessor (np.ndarray): Next node towards source, -1 for source and unreachable nodes.
+    """
+    distance = np.asarray(distance, dtype=float).copy()
+    predecessor = np.asarray(predecessor, dtype=np.int64).copy()
+    # Children of every node in the tree, in CSR form
+    has_parent = predecessor >= 0
+    children = np.flatnonzero(has_parent)[np.argsort(predecessor[has_parent], kind='stable')]
+    child_ptr = np.zeros(graph.n_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(predecessor[has_parent], minlength=graph.n_nodes), out=child_ptr[1:])
+
+    lost = np.zeros(graph.n_nodes, dtype=bool)
+    n_lost = 0
+    frontier = np.asarray(touched, dtype=np.int64)
+    frontier = frontier[frontier != source]
+    while len(frontier):
+        lost[frontier] = True
+        n_lost += len(frontier)
+        if n_lost > max_fraction * graph.n_nodes:
+            return dijkstra(graph, source)
+        counts = child_ptr[frontier + 1] - child_ptr[frontier]
+        offsets = np.repeat(child_ptr[frontier] - np.cumsum(counts) + counts, counts)
+        frontier = children[offsets + np.arange(counts.sum())]
+        frontier = frontier[~lost[frontier]]
+    distance[lost] = np.inf
+    predecessor[lost] = -1
+
+    # Lost nodes start from their best valid neighbor, touched nodes may also improve their neighbors
+    nodes = np.union1d(np.flatnonzero(lost), touched).astype(np.int64)
+    neighbors = graph.neighbor_table[nodes]
+    candidates = np.where(neighbors >= 0, distance[neighbors] + graph.edge_lengths[graph.edge_table[nodes]], np.inf)
+    if graph.max_degree:
+        best = np.argmin(candidates, axis=1)
+        value = candidates[np.arange(len(nodes)), best]
+        better = value < distance[nodes]
+        distance[nodes[better]] = value[better]
+        predecessor[nodes[better]] = neighbors[np.arange(len(nodes)), best][better]
+    reached = np.isfinite(distance[nodes])
+    heap = list(zip(distance[nodes[reached]].tolist(), nodes[reached].tolist()))
+    heapq.heapify(heap)
+    while heap:
+        d, node = heapq.heappop(heap)
+        if d > distance[node]:
+            continue
+        start, end = graph.indptr[node], graph.indptr[node + 1]
+        for target, length in zip(graph.indices[start:end].tolist(), graph.edge_lengths[start:end].tolist()):
+            candidate = d + length
+            if candidate < distance[target]:
+                distance[target] = candidate
+                predecessor[target] = node
+                heapq.heappush(heap, (candidate, target))
+    return distance, predecessor
+
+def astar(graph, start, goal):
+    """
+    Shortest path between two nodes, guided by the straight-line distance to the goal.
+
+    Returns:
+        nodes (np.ndarray): Node ids of the path, None if the goal is unreachable.
+        length (float): Length of the path, np.inf if the goal is unreachable.
+    """
+    coordinates = graph.coordinates
+    goal_point = coordinates[goal]
+    distance = {start: 0.0}
+    predecessor = {start: -1}
+    heap = [(np.sqrt(((coordinates[start] - goal_point) ** 2).sum()), start)]
+    closed = set()
+    while heap:
+        f, node = heapq.heappop(heap)
+        if node == goal:
+            break
+        if node in closed:
+            continue
+        closed.add(node)
+        start_edge, end_edge = graph.indptr[node], graph.indptr[node + 1]
+        targets = graph.indices[start_edge:end_edge]
+        candidates = distance[node] + graph.edge_lengths[start_edge:end_edge]
+        estimates = candidates + np.sqrt(((coordinates[targets] - goal_point) ** 2).sum(axis=1))
+        for target, candidate, estimate in zip(targets.tolist(), candidates.tolist(), estimates.tolist()):
+            if candidate < distance.get(target, np.inf):
+                distance[target] = candidate
+                predecessor[target] = node
+                heapq.heappush(heap, (estimate, target))
+    if goal not in distance:
+        return None, np.inf
+    return follow(predecessor, goal)[::-1], distance[goal]
+
+def follow(predecessor, node):
+    """Nodes visited from node following the predecessors until the root of the tree."""
+    nodes = [node]
+    while predecessor[nodes[-1]] >= 0:
+        nodes.append(int(predecessor[nodes[-1]]))
+    return np.array(nodes, dtype=np.int64)
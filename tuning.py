@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 12:20:53 2026
+
+@author: Rodolfo Alberto Reyes Corona
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import os
+import numpy as np
+from colony import construct_colony
+
+# Grid graph of the worker process, sent once when the pool starts
+_graph = None
+
+def _init_worker(graph):
+    global _graph
+    _graph = graph
+
+def rollout_scores(graph, pheromones, candidates, start, goal, n_ants, max_step, seed, heuristic=None, tabu=False):
+    """
+    Score every (beta, alpha) candidate with a short ACO rollout.
+
+    Every candidate uses the same seed, so the scores only differ by the values of alpha and beta.
+    The score is the mean path length of the colony, an ant that does not reach the goal counts
+    as a path of max_step times the longest edge.
+    """
+    graph = graph if graph is not None else _graph
+    penalty = max_step * graph.edge_lengths.max()
+    rows = np.arange(n_ants)
+    scores = []
+    for beta, alpha in candidates:
+        rng = np.random.default_rng(seed)
+        paths, edges, n_steps, costs = construct_colony(graph, pheromones, alpha, beta, start, goal,
+                                                        n_ants, max_step, rng, heuristic=heuristic, tabu=tabu)
+        reached = paths[rows, n_steps] == goal
+        scores.append(np.where(reached, costs, penalty).mean())
+    return scores
+
+class RolloutFitness:
+    def __init__(self, graph, start, goal, n_ants=10, max_step=250, quantization=0.02, n_workers=None, seed=0,
+                 heuristic=None, tabu=False):
+        """
+        Fitness of the alpha/beta tuner, every particle is scored by a seeded ACO rollout.
+
+        Args:
+            graph (GridGraph): Grid graph of the planner.
+            start (int): Node id where the rollout ants start.
+            goal (int): Node id of the goal.
+            n_ants (int): Number of ants of every rollout.
+            max_step (int): Maximum number of steps of a rollout ant.
+            quantization (float): Step used to round (beta, alpha) before looking up the memo.
+            n_workers (int): Number of worker processes, None for every core, 0 or 1 to run inline.
+            seed (int): Seed shared by every rollout.
+            heuristic (np.ndarray): Goal-directed factor of every edge used by the planner, optional.
+            tabu (bool): The rollout ants avoid their visited nodes, like the planner.
+        Example:
+            fitness = RolloutFitness(planner.graph, start, goal)
+            fitness.reset(planner.pheromones)
+            costs = fitness(positions)
+        """
+        self.graph = graph
+        self.start = start
+        self.goal = goal
+        self.n_ants = n_ants
+        self.max_step = max_step
+        self.quantization = quantization
+        self.n_workers = n_workers if n_workers is not None else os.cpu_count()
+        self.seed = seed
+        self.heuristic = heuristic
+        self.tabu = tabu
+        self.pheromones = None
+        self.memo = {}
+        self.evaluations = 0
+        self.executor = None
+
+    def reset(self, pheromones):
+        """New pheromone state, the memoized scores are no longer valid."""
+        self.pheromones = pheromones.copy()
+        self.memo = {}
+
+    def __call__(self, positions):
+        keys = [tuple(key) for key in np.round(positions / self.quantization).astype(np.int64)]
+        pending = sorted(set(key for key in keys if key not in self.memo))
+        if pending:
+            candidates = np.array(pending, dtype=float) * self.quantization
+            self.memo.update(zip(pending, self._evaluate(candidates)))
+            self.evaluations += len(pending)
+        return np.array([self.memo[key] for key in keys])
+
+    def _evaluate(self, candidates):
+        if self.n_workers <= 1:
+            return rollout_scores(self.graph, self.pheromones, candidates, self.start, self.goal,
+                                  self.n_ants, self.max_step, self.seed, self.heuristic, self.tabu)
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(self.n_workers, initializer=_init_worker, initargs=(self.graph,))
+        chunks = np.array_split(candidates, min(self.n_workers, len(candidates)))
+        futures = [self.executor.submit(rollout_scores, None, self.pheromones, chunk, self.start, self.goal,
+                                        self.n_ants, self.max_step, self.seed, self.heuristic, self.tabu) for chunk in chunks]
+        return [score for future in futures for score in future.result()]
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None